@@ -0,0 +1,126 @@
+import sys
+from collections.abc import MutableMapping
+from datetime import date as Date, datetime
+
+fields = ('appt_id', 'patient_id', 'doctor', 'date', 'time', 'reason', 'status', 'created_at', 'series_id')
+field_set = frozenset(fields)
+
+#Values that repeat across many appointments share one string object
+interned_fields = {'doctor', 'date', 'time', 'status'}
+
+#Older records store dates like "April 10, 2025"
+date_formats = ("%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%m/%d/%Y")
+time_formats = ("%H:%M", "%I:%M %p")
+
+def parse_date(text):
+    try:
+        return Date.fromisoformat(text)
+    except (TypeError, ValueError):
+        pass
+    for fmt in date_formats:
+        try:
+            return datetime.strptime(text.strip(), fmt).date()
+        except (AttributeError, ValueError):
+            continue
+    return None
+
+def parse_time(text):
+    for fmt in time_formats:
+        try:
+            parsed = datetime.strptime(text.strip(), fmt)
+            return parsed.hour * 60 + parsed.minute
+        except (AttributeError, ValueError):
+            continue
+    return None
+
+def normalize_date(text):
+    day = parse_date(text)
+    return day.isoformat() if day else text
+
+#Minutes since 0001-01-01 (date ordinal * 1440 + minute of day), or None if the date can't be read
+def compute_timestamp(date_text, time_text):
+    day = parse_date(date_text)
+    if day is None:
+        return None
+    return day.toordinal() * 1440 + (parse_time(time_text) or 0)
+
+def datetime_timestamp(moment):
+    return moment.toordinal() * 1440 + moment.hour * 60 + moment.minute
+
+unparsed = object()
+
+#Slotted appointment record with dict-style access, so screens can keep using appt['status']
+class Appointment(MutableMapping):
+    __slots__ = fields + ('extra', 'cached_timestamp')
+
+    def __init__(self, values=None, **kwargs):
+        self.extra = None
+        self.cached_timestamp = unparsed
+        for key, value in dict(values or {}, **kwargs).items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key in field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in field_set:
+            if key in interned_fields and type(value) is str:
+                value = sys.intern(value)
+            if key in ('date', 'time'):
+                self.cached_timestamp = unparsed
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in field_set:
+            if key in ('date', 'time'):
+                self.cached_timestamp = unparsed
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for key in fields:
+            if hasattr(self, key):
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Appointment({self.to_dict()!r})"
+
+    def to_dict(self):
+        return dict(self.items())
+
+    #Parsed once, then reused until date or time is written again
+    @property
+    def timestamp(self):
+        if self.cached_timestamp is unparsed:
+            self.cached_timestamp = compute_timestamp(self.get('date'), self.get('time'))
+        return self.cached_timestamp
+
+def timestamp(appt):
+    if isinstance(appt, Appointment):
+        return appt.timestamp
+    return compute_timestamp(appt.get('date'), appt.get('time'))
+
+def compact(records):
+    return [record if isinstance(record, Appointment) else Appointment(record) for record in records]
@@ -1,13 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
 import database as db
+import instrumentation
+from scheduling import SchedulingService, time_slots, statuses, frequencies
+from appointment_store import parse_date
+from validation import ValidationError
 from gui import GUI
+from calendar_view import CalendarWindow
+from virtual_tree import VirtualTreeview
 
 class AppointmentAndSchedulingSystem:   
-    def __init__(self, root, current_user):
+    window_title = "Appointment and Scheduling System"
+    window_geometry = '1000x600+350+200'
+    #Collections the screen shows; MainApplication refreshes a cached screen when one changed
+    data_files = [db.appointments_file, db.users_file]
+
+    #`parent` is the frame the screen is built in, so MainApplication can keep it alive while hidden
+    def __init__(self, root, current_user, parent=None):
         self.root = root
-        self.root.title("Appointment and Scheduling System")
+        self.parent = parent or root
+        self.root.title(self.window_title)
         self.current_user = current_user
         
         self.GUI = GUI(self.root)
@@ -18,14 +30,12 @@ class AppointmentAndSchedulingSystem:
         self.show_user_management_callback = None
         
         db.initialize_data_files()
-        self.users = db.load_data(db.users_file)
-        self.patients = db.load_data(db.patients_file)
-        self.appointments = db.load_data(db.appointments_file)
+        self.scheduling = SchedulingService()
         
         self.root.configure(bg=GUI.bg_color)
-        self.root.geometry('1000x600+350+200')
+        self.root.geometry(self.window_geometry)
 
-        self.nav_frame = tk.Frame(root, bg=GUI.bg_color)
+        self.nav_frame = tk.Frame(self.parent, bg=GUI.bg_color)
         self.nav_frame.pack(fill='x', pady=(20, 15), padx=15)
         
         if current_user['role'] == 'Admin':
@@ -36,7 +46,7 @@ class AppointmentAndSchedulingSystem:
 
         tk.Button(self.nav_frame, text="Logout", command=self.logout, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='right')
         
-        self.dashboard_content = tk.Frame(root, bg=GUI.bg_color)
+        self.dashboard_content = tk.Frame(self.parent, bg=GUI.bg_color)
         self.dashboard_content.pack(fill='both', expand=True)
         
         self.show_appointments()
@@ -53,6 +63,10 @@ class AppointmentAndSchedulingSystem:
         elif self.return_to_dashboard_callback: 
             self.return_to_dashboard_callback()
             
+    #Reloads the list, keeping the applied filter or doctor
+    def refresh(self):
+        self.refresh_view()
+
     def return_to_dashboard(self):
         if self.return_to_dashboard_callback:
             self.return_to_dashboard_callback()
@@ -76,25 +90,38 @@ class AppointmentAndSchedulingSystem:
         self.appt_filter = ttk.Combobox(option_frame, values=["All", "Today", "Upcoming", "Past", "Pending", "Confirmed", "Cancelled"], width=GUI.combo_width)
         self.appt_filter.pack(side='left', padx=5)
         self.appt_filter.current(0)
+
+        #Doctors only ever see their own schedule, so only other staff pick a doctor
+        self.doctor_selection = None
+        if self.current_user['role'] in ['Admin', 'Nurse']:
+            tk.Label(option_frame, text="Doctor:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(side='left', padx=(10, 5))
+            self.doctor_selection = ttk.Combobox(option_frame, values=["All"] + self.scheduling.doctors(), width=GUI.combo_width)
+            self.doctor_selection.pack(side='left', padx=5)
+            self.doctor_selection.current(0)
+            self.doctor_selection.bind("<<ComboboxSelected>>", self.filter_by_doctor)
+
+        self.patient_search = None
+        if self.current_user['role'] != 'Patient':
+            tk.Label(option_frame, text="Patient:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(side='left', padx=(10, 5))
+            self.patient_search = tk.Entry(option_frame, width=15)
+            self.patient_search.pack(side='left', padx=5)
+            self.patient_search.bind('<Return>', lambda event: self.filter_appointments())
             
         tk.Button(option_frame, text="Apply Filter", command=self.filter_appointments, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
             
         if self.current_user['role'] in ['Doctor', 'Nurse']:
             tk.Button(option_frame, text="Doctor Schedule", command=self.show_doctor_schedule, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
+        if self.current_user['role'] != 'Patient':
+            tk.Button(option_frame, text="Calendar", command=self.show_calendar, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
         
         #Treeview to display appointments
         tree_frame = tk.Frame(self.dashboard_content, padx=15, bg=GUI.bg_color)
         tree_frame.pack(fill='both', expand=True)
             
-        scrollbar = ttk.Scrollbar(tree_frame)
-        scrollbar.pack(side='right', fill='y')
-            
         columns = ('patient', 'doctor', 'date', 'time', 'reason', 'status')
-        self.appt_tree = ttk.Treeview(tree_frame, columns=columns, yscrollcommand=scrollbar.set)
+        self.appt_tree = VirtualTreeview(tree_frame, columns=columns)
         self.appt_tree.pack(fill='both', expand=True)
             
-        scrollbar.config(command=self.appt_tree.yview)
-            
         #Configure columns
         self.appt_tree.heading('#0', text='Appt ID')
         self.appt_tree.column('#0', width=80)
@@ -102,6 +129,10 @@ class AppointmentAndSchedulingSystem:
         for col in columns:
             self.appt_tree.heading(col, text=col.capitalize())
             self.appt_tree.column(col, width=120)
+
+        #Bookings and edits patch their rows in place; the subscription ends with the tree
+        listener = db.subscribe(db.appointments_file, self.on_appointment_changed)
+        self.appt_tree.bind('<Destroy>', lambda event: db.unsubscribe(db.appointments_file, listener))
                 
         #Add appointments to treeview
         self.load_all_appointments()
@@ -114,155 +145,91 @@ class AppointmentAndSchedulingSystem:
 
         if self.current_user['role'] in ['Admin', 'Nurse', 'Patient']:
             tk.Button(btn_frame, text="Book New Appointment", command=self.show_book_appointments, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
+            if self.current_user['role'] != 'Patient':
+                tk.Button(btn_frame, text="Book Series", command=self.show_book_series, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
             tk.Button(btn_frame, text="Reschedule Appointment", command=self.show_reschedule_appointments, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
             tk.Button(btn_frame, text="Cancel Appointment", command=self.cancel_appointment, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
 
             if self.current_user['role'] == 'Nurse':
                 tk.Button(btn_frame, text="Update Status", command=self.show_update_appointment_status, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
                     
+    @instrumentation.timed("appointments.load_all_appointments")
     def load_all_appointments(self):
+        self.view = {'filter_by': "All", 'doctor': None, 'patient_prefix': None}
+        self.refresh_view()
+
+    def row_values(self, appt, patient_user):
+        return (patient_user.get('name', 'Unknown'), 
+                appt.get('doctor', 'Unknown'), 
+                appt.get('date', 'Unknown'), 
+                appt.get('time', 'Unknown'), 
+                appt.get('reason', 'Unknown'), 
+                appt.get('status', 'Unknown'))
+
+    def show_rows(self, rows):
         self.appt_tree.delete(*self.appt_tree.get_children())
-    
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        for appt in self.appointments:
-            try:
-                # Find patient user
-                patient_user = None
-                for user in self.users:
-                    if 'patient_id' in user and user['patient_id'] == appt.get('patient_id'):
-                        patient_user = user
-                        break
-                        
-                if not patient_user:
-                    continue
-                    
-                # Role-based filtering
-                if self.current_user['role'] == 'Patient':
-                    if 'patient_id' not in self.current_user or appt['patient_id'] != self.current_user.get('patient_id'):
-                        continue
-                elif self.current_user['role'] == 'Doctor':
-                    if appt['doctor'] != self.current_user['name']:
-                        continue
-                        
-                # Add to treeview
-                self.appt_tree.insert('', 'end', text=appt['appt_id'],
-                                    values=(patient_user.get('name', 'Unknown'), 
-                                        appt.get('doctor', 'Unknown'), 
-                                        appt.get('date', 'Unknown'), 
-                                        appt.get('time', 'Unknown'), 
-                                        appt.get('reason', 'Unknown'), 
-                                        appt.get('status', 'Unknown')))
-            except KeyError as e:
-                print(f"Error loading appointment {appt.get('appt_id', 'Unknown')}: {e}")
-                continue
+        for appt, patient_user in rows:
+            self.appt_tree.insert('', 'end', text=appt.get('appt_id', 'Unknown'),
+                                values=self.row_values(appt, patient_user))
+        self.appt_tree.resort() #Keeps a column sort the user picked
+
+    #Inserts, updates or removes the one changed row, keeping the filter, sort and scroll position
+    def on_appointment_changed(self, filename, op, appt_id):
+        if op is None:
+            self.refresh_view()
+            return
+        row = self.scheduling.row(appt_id, current_user=self.current_user, **self.view) if op != 'delete' else None
+        shown = self.appt_tree.exists(appt_id)
+        if row:
+            appt, patient_user = row
+            if shown:
+                self.appt_tree.item(appt_id, values=self.row_values(appt, patient_user))
+                self.appt_tree.resort_row(appt_id)
+            else:
+                self.appt_tree.insert_sorted('', text=appt_id, values=self.row_values(appt, patient_user))
+        elif shown:
+            self.appt_tree.delete(appt_id)
 
+    def refresh_view(self):
+        self.show_rows(self.scheduling.query(current_user=self.current_user, **self.view))
+
+    #Status or date preset, doctor and patient name prefix, applied together in one query
+    @instrumentation.timed("appointments.filter_appointments")
     def filter_appointments(self):
-        filter_by = self.appt_filter.get()
-        self.appt_tree.delete(*self.appt_tree.get_children())
-        
-        today = datetime.now().strftime("%Y-%m-%d")
-        now = datetime.now().strftime("%H:%M")
-        
-        for appt in self.appointments:
-            try:
-                # Find patient user
-                patient_user = None
-                for user in self.users:
-                    if 'patient_id' in user and user['patient_id'] == appt.get('patient_id'):
-                        patient_user = user
-                        break
-                
-                if not patient_user:
-                    continue
-                    
-                # Role-based filtering
-                if self.current_user['role'] == 'Patient':
-                    if 'patient_id' not in self.current_user or appt['patient_id'] != self.current_user.get('patient_id'):
-                        continue
-                elif self.current_user['role'] == 'Doctor':
-                    if appt.get('doctor') != self.current_user.get('name'):
-                        continue
-                
-                appt_datetime = datetime.strptime(f"{appt.get('date', '1970-01-01')} {appt.get('time', '00:00')}", "%Y-%m-%d %H:%M")
-                current_datetime = datetime.now()
-                
-                if filter_by == "All":
-                    pass
-                elif filter_by == "Today" and appt.get('date') != today:
-                    continue
-                elif filter_by == "Upcoming" and appt_datetime <= current_datetime:
-                    continue
-                elif filter_by == "Past" and appt_datetime > current_datetime:
-                    continue
-                elif filter_by == "Pending" and appt.get('status') != "Pending":
-                    continue
-                elif filter_by == "Confirmed" and appt.get('status') != "Confirmed":
-                    continue
-                elif filter_by == "Cancelled" and appt.get('status') != "Cancelled":
-                    continue
-                
-                self.appt_tree.insert('', 'end', text=appt.get('appt_id', 'Unknown'),
-                                    values=(patient_user.get('name', 'Unknown'), 
-                                        appt.get('doctor', 'Unknown'), 
-                                        appt.get('date', 'Unknown'), 
-                                        appt.get('time', 'Unknown'), 
-                                        appt.get('reason', 'Unknown'), 
-                                        appt.get('status', 'Unknown')))
-            except Exception as e:
-                print(f"Error filtering appointment: {e}")
-                continue
+        doctor = self.doctor_selection.get() if self.doctor_selection else ""
+        prefix = self.patient_search.get().strip() if self.patient_search else ""
+        self.view = {'filter_by': self.appt_filter.get(),
+                     'doctor': doctor if doctor and doctor != "All" else None,
+                     'patient_prefix': prefix or None}
+        self.refresh_view()
             
-    #Doctor's schedule
+    #Doctor's schedule: every appointment of one doctor, whatever the status or date
     def show_doctor_schedule(self):
         if self.current_user['role'] not in ['Doctor', 'Nurse']:
             return
         
         self.appt_filter.current(0) #Resets filter to "All"
         
-        #Nurses can select a doctor
-        if self.current_user['role'] == 'Nurse':
-            doctors = [user['name'] for user in self.users if user['role'] == 'Doctor']
-            
-            self.doctor_selection = ttk.Combobox(self.dashboard_content, values=doctors)
-            self.doctor_selection.pack(pady=5)
-            self.doctor_selection.bind("<<ComboboxSelected>>", self.filter_by_doctor)
-        else:
-            self.filter_appointments()
+        #Nurses pick the doctor; a doctor's own schedule follows from the role rules
+        if self.doctor_selection and self.doctor_selection.get() in ["", "All"]:
+            self.doctor_selection.focus_set()
+            self.doctor_selection.event_generate('<Down>')
+            return
+        self.filter_appointments()
+
+    #Week grid of the doctor picked in the filter, or of every doctor
+    def show_calendar(self):
+        doctor = self.doctor_selection.get() if self.doctor_selection else None
+        CalendarWindow(self.root, self.current_user, doctor if doctor and doctor != "All" else None)
 
-    #Filters appointments based on selected doctor
+    @instrumentation.timed("appointments.filter_by_doctor")
     def filter_by_doctor(self, event=None):
-        doctor_name = self.doctor_selection.get()
-        self.appt_tree.delete(*self.appt_tree.get_children())
-        
-        for appt in self.appointments:
-            try:
-                if appt.get('doctor') != doctor_name:
-                    continue
-                    
-                patient = next((p for p in self.patients if p.get('patient_id') == appt.get('patient_id')), None)
-                if not patient:
-                    continue
-                    
-                user = next((u for u in self.users if u.get('role') == 'Patient' and u.get('patient_id') == patient.get('patient_id')), None)
-                if not user:
-                    continue
-
-                self.appt_tree.insert('', 'end', text=appt.get('appt_id', 'Unknown'),
-                                    values=(user.get('name', 'Unknown'), 
-                                        appt.get('doctor', 'Unknown'), 
-                                        appt.get('date', 'Unknown'), 
-                                        appt.get('time', 'Unknown'), 
-                                        appt.get('reason', 'Unknown'), 
-                                        appt.get('status', 'Unknown')))
-            except Exception as e:
-                print(f"Error filtering by doctor: {e}")
-                continue
+        self.filter_appointments()
                 
     def show_book_appointments(self):
         self.book_appt_window = tk.Toplevel(self.root, bg=GUI.bg_color)
         self.book_appt_window.title("Book New Appointment")
-        self.book_appt_window.geometry("450x500+600+225")
+        self.book_appt_window.geometry("450x545+600+225")
 
         form_frame = tk.Frame(self.book_appt_window, bg=GUI.bg_color)
         form_frame.pack(pady=10)
@@ -276,20 +243,23 @@ class AppointmentAndSchedulingSystem:
 
         #Doctor selection
         tk.Label(self.book_appt_window, text="Select Doctor:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=5)
-        doctors = [user['name'] for user in db.load_data(db.users_file) if user['role'] == 'Doctor']
-        self.appt_doctor = ttk.Combobox(self.book_appt_window, values=doctors, width=GUI.combo_width)
+        self.appt_doctor = ttk.Combobox(self.book_appt_window, values=self.scheduling.doctors(), width=GUI.combo_width)
         self.appt_doctor.pack(pady=5)
+        self.appt_doctor.bind("<<ComboboxSelected>>", lambda event: self.update_free_times())
         
         #Date selection
         tk.Label(self.book_appt_window, text="Date:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=5)
         self.appt_date = tk.Entry(self.book_appt_window, width=GUI.entry_width)
         self.appt_date.pack(pady=5)
+        self.appt_date.bind('<FocusOut>', lambda event: self.update_free_times())
+        self.appt_date.bind('<Return>', lambda event: self.update_free_times())
         
-        #Time selection
+        #Time selection, only the doctor's free slots on that date
         tk.Label(self.book_appt_window, text="Time:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=5)
         self.appt_time = ttk.Combobox(self.book_appt_window,
-                                    values=[f"{h:02d}:{m:02d}" for h in range(9, 17) for m in [0, 30]], width=GUI.combo_width)
+                                    values=[], width=GUI.combo_width, state='readonly')
         self.appt_time.pack(pady=5)
+        tk.Button(self.book_appt_window, text="Next Free Slot", command=self.fill_next_free_slot, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(pady=5)
         
         #Reason
         tk.Label(self.book_appt_window, text="Reason:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=5)
@@ -299,69 +269,127 @@ class AppointmentAndSchedulingSystem:
         #Submit button
         tk.Button(self.book_appt_window, text="Submit", command=self.book_appointment, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(pady=10)
         
-    def book_appointment(self):
-        name = self.appt_name.get()
-        doctor = self.appt_doctor.get()
-        date = self.appt_date.get()
-        time = self.appt_time.get()
-        reason = self.appt_reason.get("1.0", tk.END).strip()
-        
-        #Validation
-        if not all([name, doctor, date, time, reason]):
-            messagebox.showerror("Error", "All fields are required!")
+    def update_free_times(self):
+        doctor, date = self.appt_doctor.get(), self.appt_date.get().strip()
+        times = self.scheduling.free_times(doctor, date) if doctor and date else []
+        self.appt_time['values'] = times
+        if self.appt_time.get() not in times:
+            self.appt_time.set("")
+
+    #First free slot from the entered date (or today) for the chosen doctor, or any doctor
+    def fill_next_free_slot(self):
+        try:
+            slots = self.scheduling.next_free_slots(self.appt_doctor.get() or None, self.appt_date.get().strip() or None, count=1)
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
-        
-        #Find the patient user
-        patient_user = None
-        for user in self.users:
-            if user['name'] == name and user['role'] == 'Patient':
-                patient_user = user
-                break
-                
-        if not patient_user:
-            messagebox.showerror("Error", "Patient not found!")
+        if not slots:
+            messagebox.showinfo("Info", "No free slots in the next 90 days.")
             return
-        
-        #Find the patient record
-        patient = next((p for p in self.patients if p.get('patient_id') == patient_user.get('patient_id')), None)
-        if not patient:
-            messagebox.showerror("Error", "Patient record not found!")
+
+        date, time, doctor = slots[0]
+        self.appt_doctor.set(doctor)
+        self.appt_date.delete(0, tk.END)
+        self.appt_date.insert(0, date)
+        self.update_free_times()
+        self.appt_time.set(time)
+
+    def book_appointment(self):
+        try:
+            self.scheduling.book(patient_name=self.appt_name.get(),
+                                 doctor=self.appt_doctor.get(),
+                                 date=self.appt_date.get(),
+                                 time=self.appt_time.get(),
+                                 reason=self.appt_reason.get("1.0", tk.END).strip())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
         
-        #Check for time slot availability
-        for appt in self.appointments:
-            if (appt['doctor'] == doctor and 
-                appt['date'] == date and 
-                appt['time'] == time and 
-                appt['status'] != 'Cancelled'):
-                messagebox.showerror("Error", "This time slot is already booked!")
-                return
-        
-        #Create new appointment
-        new_appt = {
-            "appt_id": f"A{len(self.appointments)+1:04d}",
-            "patient_id": patient_user['patient_id'],
-            "doctor": doctor,
-            "date": date,
-            "time": time,
-            "reason": reason,
-            "status": "Pending",
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        #Add to appointments
-        self.appointments.append(new_appt)
-        db.save_data(self.appointments, db.appointments_file)
-            
-        #Add to patient's record
-        if 'appointments' not in patient:
-            patient['appointments'] = []
-        patient['appointments'].append(new_appt['appt_id'])
-        db.save_data(self.patients, db.patients_file)
-        
         messagebox.showinfo("Success", "Appointment booked successfully!")
         self.book_appt_window.destroy()
-        self.show_appointments()
+
+    #Recurring series: check every date first, then book the whole plan at once
+    def show_book_series(self):
+        self.series_window = tk.Toplevel(self.root, bg=GUI.bg_color)
+        self.series_window.title("Book Appointment Series")
+        self.series_window.geometry("520x640+575+150")
+        self.series_plan = None
+
+        tk.Label(self.series_window, text="Book Series", font=self.GUI.header1_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=(10, 5))
+
+        form_frame = tk.Frame(self.series_window, bg=GUI.bg_color)
+        form_frame.pack(pady=5)
+
+        labels = ["Patient's Full Name:", "Doctor:", "First Date:", "Time:", "Repeat:", "Occurrences:", "Or Until:"]
+        for i, label_text in enumerate(labels):
+            tk.Label(form_frame, text=label_text, font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).grid(row=i, column=0, sticky='e', padx=5, pady=3)
+
+        self.series_name = tk.Entry(form_frame, width=GUI.entry_width)
+        self.series_doctor = ttk.Combobox(form_frame, values=self.scheduling.doctors(), width=GUI.combo_width)
+        self.series_date = tk.Entry(form_frame, width=GUI.entry_width)
+        self.series_time = ttk.Combobox(form_frame, values=time_slots, width=GUI.combo_width, state='readonly')
+        self.series_frequency = ttk.Combobox(form_frame, values=frequencies, width=GUI.combo_width, state='readonly')
+        self.series_frequency.current(0)
+        self.series_count = tk.Entry(form_frame, width=GUI.entry_width)
+        self.series_until = tk.Entry(form_frame, width=GUI.entry_width)
+        for i, widget in enumerate([self.series_name, self.series_doctor, self.series_date, self.series_time,
+                                    self.series_frequency, self.series_count, self.series_until]):
+            widget.grid(row=i, column=1, padx=5, pady=3)
+
+        tk.Label(self.series_window, text="Reason:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=(5, 0))
+        self.series_reason = tk.Text(self.series_window, height=3, width=GUI.textbox_width)
+        self.series_reason.pack(pady=5)
+
+        tk.Button(self.series_window, text="Check Dates", command=self.check_series, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(pady=5)
+
+        self.series_tree = ttk.Treeview(self.series_window, columns=('date', 'time', 'note'), height=8)
+        self.series_tree.heading('#0', text='Requested')
+        self.series_tree.column('#0', width=110)
+        for col, width in [('date', 110), ('time', 70), ('note', 180)]:
+            self.series_tree.heading(col, text=col.capitalize())
+            self.series_tree.column(col, width=width)
+        self.series_tree.pack(padx=15, pady=5)
+
+        tk.Button(self.series_window, text="Book Series", command=self.book_series, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(pady=(5, 10))
+
+    def check_series(self):
+        count = self.series_count.get().strip()
+        if count and not count.isdigit():
+            messagebox.showerror("Error", "Occurrences must be a number!")
+            return
+        try:
+            self.series_plan = self.scheduling.plan_series(self.series_doctor.get(), self.series_date.get().strip(),
+                                                           self.series_time.get(), self.series_frequency.get(),
+                                                           count=int(count) if count else None,
+                                                           until=self.series_until.get().strip() or None)
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.series_plan_doctor = self.series_doctor.get()
+
+        self.series_tree.delete(*self.series_tree.get_children())
+        for entry in self.series_plan:
+            if not entry['date']:
+                note = "No free slot nearby"
+            elif (entry['date'], entry['time']) != (entry['requested'], self.series_time.get()):
+                note = "Taken, alternative offered"
+            else:
+                note = ""
+            self.series_tree.insert('', 'end', text=entry['requested'], values=(entry['date'] or "-", entry['time'] or "-", note))
+
+    def book_series(self):
+        if not self.series_plan or self.series_plan_doctor != self.series_doctor.get():
+            messagebox.showerror("Error", "Please check the dates first!")
+            return
+        try:
+            booked = self.scheduling.book_series(self.series_doctor.get(), self.series_reason.get("1.0", tk.END).strip(),
+                                                 self.series_plan, patient_name=self.series_name.get())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        messagebox.showinfo("Success", f"Booked {len(booked)} appointments!")
+        self.series_window.destroy()
 
     def show_reschedule_appointments(self):
         selected_item = self.appt_tree.selection()
@@ -371,7 +399,7 @@ class AppointmentAndSchedulingSystem:
         
         item = self.appt_tree.item(selected_item)
         appt_id = item['text']
-        doctor = item['text']
+        doctor = item['values'][1]
         
         self.resched_appt_window = tk.Toplevel(self.root, bg=GUI.bg_color)
         self.resched_appt_window.title("Reschedule Appointment Date")
@@ -387,40 +415,39 @@ class AppointmentAndSchedulingSystem:
         #Time selection
         tk.Label(self.resched_appt_window, text="Time:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=5)
         self.resched_appt_time = ttk.Combobox(self.resched_appt_window,
-                                    values=[f"{h:02d}:{m:02d}" for h in range(9, 17) for m in [0, 30]], width=GUI.combo_width)
+                                    values=time_slots, width=GUI.combo_width)
         self.resched_appt_time.pack(pady=5)
+
+        #Part of a series: optionally move every open occurrence by the same number of days
+        self.resched_series = tk.BooleanVar(value=False)
+        appt = db.find(db.appointments_file, 'appt_id', appt_id)
+        if appt and appt.get('series_id'):
+            self.resched_appt_window.geometry("450x310+625+325")
+            tk.Checkbutton(self.resched_appt_window, text="Move the whole series", variable=self.resched_series,
+                           font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=5)
         
         tk.Button(self.resched_appt_window, text="Reschedule", command=lambda: self.reschedule_appointment(appt_id, doctor), font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(pady=10)
 
     def reschedule_appointment(self, appt_id, doctor):
-        new_date = self.resched_appt_date.get()
-        new_time = self.resched_appt_time.get()
-        
-        if not new_date:
-            messagebox.showerror("Error", "Please set a date!")
-            return
-        elif not new_time:
-            messagebox.showerror("Error", "Please set a time!")
-            return
-        if not new_date and not new_time:
-            messagebox.showerror("Error", "Please set a time and date!")
+        try:
+            if self.resched_series.get():
+                appt = self.scheduling.get(appt_id)
+                #No date means the series keeps its dates and only moves to the new time
+                days = 0
+                if self.resched_appt_date.get().strip():
+                    date, old = parse_date(self.resched_appt_date.get()), parse_date(appt.get('date'))
+                    if not date or not old:
+                        raise ValidationError("Invalid date! Use YYYY-MM-DD.")
+                    days = (date - old).days
+                self.scheduling.reschedule_series(appt['series_id'], days, self.resched_appt_time.get() or None)
+            else:
+                self.scheduling.reschedule(appt_id, self.resched_appt_date.get(), self.resched_appt_time.get(), doctor)
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
-        
-        for appt in self.appointments:
-            if appt['doctor'] == doctor and appt['date'] == new_date and appt['time'] == new_time: 
-                messagebox.showerror("Error", "This time slot is already booked!")
-                return
-
-        for idx, appt in enumerate(self.appointments):
-            if appt['appt_id'] == appt_id:
-                self.appointments[idx]['date'] = new_date
-                self.appointments[idx]['time'] = new_time
-                break
 
-        db.save_data(self.appointments, db.appointments_file)
-        messagebox.showinfo("Success", "Status updated successfully!")
-        self.update_status_window.destroy()
-        self.show_appointments() 
+        messagebox.showinfo("Success", "Appointment rescheduled successfully!")
+        self.resched_appt_window.destroy()
 
     def view_appointment_details(self):
         selected_item = self.appt_tree.selection()
@@ -432,19 +459,10 @@ class AppointmentAndSchedulingSystem:
             item = self.appt_tree.item(selected_item)
             appt_id = item['text']
             
-            appointment = next((a for a in self.appointments if a.get('appt_id') == appt_id), None)
-            if not appointment:
-                messagebox.showerror("Error", "Appointment not found!")
-                return
-                
-            patient = next((p for p in self.patients if p.get('patient_id') == appointment.get('patient_id')), None)
-            if not patient:
-                messagebox.showerror("Error", "Patient record not found!")
-                return
-                
-            user = next((u for u in self.users if u.get('role') == 'Patient' and u.get('patient_id') == patient.get('patient_id')), None)
-            if not user:
-                messagebox.showerror("Error", "User record not found!")
+            try:
+                appointment, patient, user = self.scheduling.details(appt_id)
+            except ValidationError as e:
+                messagebox.showerror("Error", str(e))
                 return
             
             self.view_appt_window = tk.Toplevel(self.root, bg=GUI.bg_color)
@@ -501,27 +519,20 @@ class AppointmentAndSchedulingSystem:
         tk.Label(self.update_status_window, text="Select new status:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=5)
         
         self.new_status = ttk.Combobox(self.update_status_window,
-                                    values=["Pending", "Confirmed", "Cancelled", "Completed"], width=GUI.combo_width)
+                                    values=statuses, width=GUI.combo_width)
         self.new_status.pack(pady=5)
         
         tk.Button(self.update_status_window, text="Update", command=lambda: self.update_appointment_status(appt_id), font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(pady=(10, 20))
         
     def update_appointment_status(self, appt_id):
-        new_status = self.new_status.get()
-        
-        if not new_status:
-            messagebox.showerror("Error", "Please select a status!")
+        try:
+            self.scheduling.set_status(appt_id, self.new_status.get())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
         
-        for idx, appt in enumerate(self.appointments):
-            if appt['appt_id'] == appt_id:
-                self.appointments[idx]['status'] = new_status
-                break
-        
-        db.save_data(self.appointments, db.appointments_file)
         messagebox.showinfo("Success", "Status updated successfully!")
         self.update_status_window.destroy()
-        self.show_appointments()
         
     def cancel_appointment(self):
         selected_item = self.appt_tree.selection()
@@ -532,17 +543,26 @@ class AppointmentAndSchedulingSystem:
         item = self.appt_tree.item(selected_item)
         appt_id = item['text']
         
-        if not messagebox.askyesno("Confirm", "Cancel this appointment?"):
+        appt = db.find(db.appointments_file, 'appt_id', appt_id)
+        series_id = appt.get('series_id') if appt else None
+        if series_id:
+            #Yes cancels every open occurrence, No just this one
+            whole = messagebox.askyesnocancel("Confirm", "This appointment is part of a series. Cancel the whole series?")
+            if whole is None:
+                return
+        elif not messagebox.askyesno("Confirm", "Cancel this appointment?"):
             return
         
-        for idx, appt in enumerate(self.appointments):
-            if appt['appt_id'] == appt_id:
-                self.appointments[idx]['status'] = "Cancelled"
-                break
+        try:
+            if series_id and whole:
+                self.scheduling.cancel_series(series_id)
+            else:
+                self.scheduling.cancel(appt_id)
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
+            return
             
-        db.save_data(self.appointments, db.appointments_file)
         messagebox.showinfo("Success", "Appointment cancelled!")
-        self.show_appointments()
         
 if __name__ == "__main__":
     root = tk.Tk()
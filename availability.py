@@ -0,0 +1,105 @@
+from datetime import date as Date, datetime
+import database as db
+from appointment_store import parse_date
+
+#The bookable half-hour slots of a day, 09:00 to 16:30; bit i of a day mask is time_slots[i]
+time_slots = [f"{h:02d}:{m:02d}" for h in range(9, 17) for m in [0, 30]]
+slot_bits = {time: i for i, time in enumerate(time_slots)}
+full_day = (1 << len(time_slots)) - 1
+
+#Per doctor, per day bitmask of booked slots (cancelled appointments and times off the grid
+#don't count), kept in step with row-level writes. Counts per slot keep a double-booked slot
+#taken until its last appointment goes.
+class Availability:
+    def __init__(self, data):
+        self.masks = {}
+        self.counts = {}
+        self.entries = {}
+        for record in data:
+            self.insert(record)
+
+    def insert(self, record):
+        if record.get('status') == 'Cancelled':
+            return
+        bit = slot_bits.get(record.get('time'))
+        day = parse_date(record.get('date'))
+        if bit is None or day is None:
+            return
+        key = (record.get('doctor'), day.toordinal(), bit)
+        self.entries[id(record)] = key
+        self.counts[key] = self.counts.get(key, 0) + 1
+        days = self.masks.setdefault(key[0], {})
+        days[key[1]] = days.get(key[1], 0) | (1 << bit)
+
+    def delete(self, record):
+        key = self.entries.pop(id(record), None)
+        if key is None:
+            return
+        self.counts[key] -= 1
+        if self.counts[key]:
+            return
+        del self.counts[key]
+        doctor, day, bit = key
+        days = self.masks[doctor]
+        days[day] &= ~(1 << bit)
+        if not days[day]:
+            del days[day]
+
+    def update(self, record):
+        self.delete(record)
+        self.insert(record)
+
+    #Free slots of one day as a bitmask; `after` masks off slots up to and including that bit
+    def free_mask(self, doctor, day, after=-1):
+        return full_day & ~self.masks.get(doctor, {}).get(day, 0) & ~((1 << (after + 1)) - 1)
+
+    #The first `count` free (date, time, doctor) slots from `start` on, in time order and then
+    #in the order `doctors` are given. Each day is one mask operation per doctor, so a 90-day
+    #search over hundreds of doctors is a few thousand integer operations.
+    def next_free(self, doctors, start, count=10, days=90, after=None):
+        slots = []
+        first = start.toordinal()
+        for day in range(first, first + days):
+            free = [(doctor, self.free_mask(doctor, day, after if day == first and after is not None else -1)) for doctor in doctors]
+            free = [(doctor, mask) for doctor, mask in free if mask]
+            if not free:
+                continue
+            text = Date.fromordinal(day).isoformat()
+            for bit, time in enumerate(time_slots):
+                flag = 1 << bit
+                for doctor, mask in free:
+                    if mask & flag:
+                        slots.append((text, time, doctor))
+                        if len(slots) == count:
+                            return slots
+        return slots
+
+def availability():
+    return db.get_derived(db.appointments_file, "availability", Availability)
+
+#Index of the last slot that has already started at `now`, -1 before the first one
+def elapsed_bit(now):
+    current = now.strftime("%H:%M")
+    return max([i for i, time in enumerate(time_slots) if time <= current], default=-1)
+
+#Free times of one doctor on one day, in slot order; past slots are left out when the day is today
+def free_times(doctor, date, now=None):
+    day = parse_date(date)
+    if day is None:
+        return []
+    now = now or datetime.now()
+    after = elapsed_bit(now) if day == now.date() else (len(time_slots) - 1 if day < now.date() else -1)
+    mask = availability().free_mask(doctor, day.toordinal(), after)
+    return [time for i, time in enumerate(time_slots) if mask >> i & 1]
+
+#Next `count` free (date, time, doctor) slots for `doctors` from `start` (default today), never in the past
+def next_free(doctors, start=None, count=10, days=90, now=None):
+    now = now or datetime.now()
+    start = parse_date(start) if start else now.date()
+    if start is None:
+        return []
+    if start < now.date():
+        days -= (now.date() - start).days
+        start = now.date()
+    after = elapsed_bit(now) if start == now.date() else None
+    return availability().next_free(doctors, start, count, max(days, 0), after)
@@ -0,0 +1,56 @@
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+import appointment_store
+
+doctors = ["Cedric Palapuz", "Maria Santos", "Jose Reyes", "Ana Cruz", "Paolo Garcia"]
+statuses = ["Pending", "Confirmed", "Cancelled", "Completed"]
+reasons = ["Check-up", "Feeling unwell", "Follow-up", "Vaccination", "Lab results"]
+
+def synthetic_appointments_json(count, seed=42):
+    rng = random.Random(seed)
+    return json.dumps([{
+        "appt_id": f"A{i+1:04d}",
+        "patient_id": f"P{rng.randint(1, count // 10 + 1):04d}",
+        "doctor": rng.choice(doctors),
+        "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "time": f"{rng.randint(9, 16):02d}:{rng.choice([0, 30]):02d}",
+        "reason": rng.choice(reasons),
+        "status": rng.choice(statuses),
+        "created_at": f"2025-01-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+    } for i in range(count)])
+
+#Bytes held by whatever build() returns, measured from a parsed JSON text like load_data does
+def measure(text, build):
+    gc.collect()
+    tracemalloc.start()
+    data = build(json.loads(text))
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return size
+
+def run(count):
+    text = synthetic_appointments_json(count)
+    before = measure(text, lambda records: records)
+    after = measure(text, appointment_store.compact)
+    return {
+        "appointments": count,
+        "dict_bytes_per_appointment": before / count,
+        "compact_bytes_per_appointment": after / count,
+        "saving": 1 - after / before,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bytes per appointment: plain dicts vs appointment_store")
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    result = run(args.count)
+    print(f"{result['appointments']} appointments")
+    print(f"dicts:   {result['dict_bytes_per_appointment']:.0f} bytes per appointment")
+    print(f"compact: {result['compact_bytes_per_appointment']:.0f} bytes per appointment")
+    print(f"saving:  {result['saving']:.0%}")
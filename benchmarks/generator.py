@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import random
+from datetime import date, timedelta
+import database as db
+import validation as valid
+
+first_names = ["Ana", "Ben", "Carla", "Dante", "Elena", "Felix", "Gina", "Hector", "Isa", "Jun",
+               "Karla", "Leo", "Mara", "Nico", "Olga", "Pia", "Quino", "Rosa", "Sam", "Tess"]
+last_names = ["Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Flores",
+              "Ramos", "Aquino", "Castillo", "Villanueva", "Dela Cruz", "Navarro", "Lim"]
+reasons = ["Check-up", "Feeling unwell", "Follow-up", "Vaccination", "Lab results", "Prescription refill"]
+histories = ["", "Hypertension", "Asthma", "Diabetes type 2", "Appendectomy 2019", "Migraine"]
+allergies = ["", "", "Penicillin", "Peanuts", "Dust", "Shellfish"]
+medications = ["", "", "Metformin", "Losartan", "Salbutamol inhaler", "Cetirizine"]
+questions = ["What's your mother's maiden name?", "What city were you born in?", "What was the name of your first pet?"]
+time_slots = [f"{h:02d}:{m:02d}" for h in range(9, 17) for m in [0, 30]]
+
+#Weighted so most of the history is settled and the near future is mostly open
+statuses = ["Completed"] * 5 + ["Cancelled"] * 2 + ["Confirmed"] * 2 + ["Pending"]
+
+#Every generated account logs in with this password
+password = "password"
+
+start_date = date(2024, 1, 1)
+days = 3 * 365
+
+#Sizes derived from the appointment count: one patient per ten appointments, a doctor per 2,000
+def shape(appointments):
+    return {
+        "appointments": appointments,
+        "patients": max(50, appointments // 10),
+        "doctors": max(5, appointments // 2000),
+        "nurses": max(3, appointments // 5000),
+        "admins": 2,
+    }
+
+def person(rng):
+    return f"{rng.choice(first_names)} {rng.choice(last_names)}"
+
+def staff_user(rng, user_id, role, n, hashed):
+    name = f"{role} {person(rng)} {n}"
+    return {
+        "user_id": user_id,
+        "username": f"{role.lower()}{n}",
+        "password": hashed,
+        "name": name,
+        "role": role,
+        "age": rng.randint(25, 65),
+        "gender": rng.choice(["Male", "Female"]),
+        "email": f"{role.lower()}{n}@hospital.test",
+        "contact_no": f"09{rng.randint(100000000, 999999999)}",
+        "security_question": rng.choice(questions),
+        "security_answer": "blue"
+    }
+
+#Writes users.json, patients.json and appointments.json under `directory`; the same
+#count and seed always give byte-identical files
+def generate(directory, appointments, seed=42):
+    rng = random.Random(seed)
+    sizes = shape(appointments)
+    hashed = valid.hash_password(password)
+    os.makedirs(directory, exist_ok=True)
+
+    users = []
+    for role, count in [("Admin", sizes["admins"]), ("Doctor", sizes["doctors"]), ("Nurse", sizes["nurses"])]:
+        for n in range(1, count + 1):
+            users.append(staff_user(rng, db.format_id("U", len(users) + 1), role, n, hashed))
+    doctors = [user["name"] for user in users if user["role"] == "Doctor"]
+
+    patients = []
+    for n in range(1, sizes["patients"] + 1):
+        patient_id = db.format_id("P", n)
+        name = f"{person(rng)} {n}"
+        patients.append({
+            "patient_id": patient_id,
+            "appointments": [],
+            "medical_history": rng.choice(histories),
+            "allergies": rng.choice(allergies),
+            "current_medications": rng.choice(medications),
+            "doctor_notes": "",
+            "prescriptions": []
+        })
+        users.append({
+            "user_id": db.format_id("U", len(users) + 1),
+            "patient_id": patient_id,
+            "username": f"patient{n}",
+            "password": hashed,
+            "name": name,
+            "role": "Patient",
+            "age": rng.randint(1, 95),
+            "gender": rng.choice(["Male", "Female"]),
+            "email": f"patient{n}@mail.test",
+            "contact_no": f"09{rng.randint(100000000, 999999999)}",
+            "security_question": rng.choice(questions),
+            "security_answer": "blue"
+        })
+
+    #Appointments are written as they are made; only their IDs stay in memory, on the patients
+    with open(os.path.join(directory, db.appointments_file), 'w') as file:
+        file.write("[")
+        for n in range(1, appointments + 1):
+            patient = patients[rng.randrange(len(patients))]
+            day = start_date + timedelta(days=rng.randrange(days))
+            appt = {
+                "appt_id": db.format_id("A", n),
+                "patient_id": patient["patient_id"],
+                "doctor": rng.choice(doctors),
+                "date": day.isoformat(),
+                "time": rng.choice(time_slots),
+                "reason": rng.choice(reasons),
+                "status": rng.choice(statuses),
+                "created_at": f"{(day - timedelta(days=rng.randint(1, 30))).isoformat()} {rng.randint(8, 17):02d}:{rng.randint(0, 59):02d}:00"
+            }
+            patient["appointments"].append(appt["appt_id"])
+            file.write((",\n    " if n > 1 else "\n    ") + json.dumps(appt))
+        file.write("\n]" if appointments else "]")
+
+    for filename, records in [(db.users_file, users), (db.patients_file, patients)]:
+        with open(os.path.join(directory, filename), 'w') as file:
+            db.write_records(records, file)
+
+    return sizes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write deterministic synthetic hospital data")
+    parser.add_argument("directory", help="Where users.json, patients.json and appointments.json go")
+    parser.add_argument("--appointments", type=int, default=10000, help="Number of appointments (1k to 1M)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    sizes = generate(args.directory, args.appointments, args.seed)
+    print(", ".join(f"{count} {kind}" for kind, count in sizes.items()))
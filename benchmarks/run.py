@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+import database as db
+from benchmarks import generator
+from patient_service import PatientService
+from scheduling import SchedulingService, occupancy, time_slots
+from user_service import UserService
+
+filters = ["All", "Today", "Upcoming", "Past", "Pending", "Confirmed", "Cancelled"]
+
+#Fixed "now" inside the generated date range, so date filters select the same rows every run
+now = datetime(2025, 6, 15, 12, 0)
+
+#Conflict checks per timed run; the result is for the whole batch
+probes = 1000
+
+#Seconds per run; `setup` runs before each timed call and is not counted
+def timed(action, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        action()
+        times.append(time.perf_counter() - start)
+    return {"runs": repeat, "min_s": min(times), "median_s": statistics.median(times), "max_s": max(times)}
+
+def reset_cache():
+    db.cache = db.DataCache()
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+#Times every operation against one generated data set; the current directory must hold its files
+def measure(size, engine, repeat):
+    if engine == "sqlite":
+        db.migrate_json_to_sqlite(db.sqlite_file)
+    db.set_storage_engine(engine)
+    db.initialize_data_files()
+
+    scheduling, patients, users = SchedulingService(), PatientService(), UserService()
+    shape = generator.shape(size)
+    admin = {'role': 'Admin', 'name': 'Admin'}
+    doctor = {'role': 'Doctor', 'name': db.find(db.users_file, 'username', 'doctor1')['name']}
+    results = {}
+
+    for filename in [db.users_file, db.patients_file, db.appointments_file]:
+        results[f"load_data.{db.table_name(filename)}"] = timed(lambda: db.load_data(filename), repeat)
+
+    #Cold: the users collection isn't cached, so login asks the storage engine for the one row
+    #(a streamed scan of users.json, an indexed SELECT on SQLite) and leaves it unloaded.
+    #Warm: another screen already loaded the users, so login is a username index lookup.
+    username = f"patient{shape['patients']}"
+    login = lambda: users.authenticate(username, generator.password)
+    results["login.cold"] = timed(login, repeat, setup=reset_cache)
+    results["login.warm"] = timed(login, repeat, setup=lambda: db.get_collection(db.users_file))
+
+    for filter_by in filters:
+        results[f"filter.{filter_by}"] = timed(lambda: scheduling.query(filter_by, admin, now), repeat)
+        results[f"filter.doctor.{filter_by}"] = timed(lambda: scheduling.query(filter_by, doctor, now), repeat)
+    results["doctor_schedule"] = timed(lambda: scheduling.for_doctor(doctor['name']), repeat)
+    results["patient_list"] = timed(lambda: patients.list_for(admin), repeat)
+    results["patient_list.cold"] = timed(lambda: patients.list_for(admin), repeat, setup=reset_cache)
+
+    #Random slots inside the generated range, most of them free
+    rng = random.Random(size)
+    doctors = scheduling.doctors()
+    slots = [(rng.choice(doctors), f"{rng.randint(2024, 2026)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+              rng.choice(time_slots)) for _ in range(probes)]
+    results["conflict_check"] = timed(lambda: [occupancy().is_taken(*slot) for slot in slots], repeat)
+    results["conflict_check.cold"] = timed(lambda: occupancy().is_taken(*slots[0]), repeat, setup=reset_cache)
+
+    #Each booking takes the next free slot after the generated range, then waits for its write
+    bookings = iter((doctors[n % len(doctors)], f"2030-01-{n // len(time_slots) % 28 + 1:02d}", time_slots[n % len(time_slots)])
+                    for n in range(len(time_slots) * 28 * len(doctors)))
+    def book():
+        doctor_name, date, slot = next(bookings)
+        scheduling.book(doctor_name, date, slot, "Benchmark", patient_id="P0001", now=now)
+        db.flush_writes()
+    results["book"] = timed(book, repeat)
+
+    #Rewrites the whole appointments file, as a full save does
+    appointments = db.get_collection(db.appointments_file)
+    results["save_data.appointments"] = timed(lambda: (db.save_data(appointments, db.appointments_file), db.flush_writes()), repeat)
+
+    return {"size": size, "shape": shape, "metrics": results}
+
+def run(sizes, engine="json", repeat=5, seed=42):
+    report = {
+        "revision": revision(),
+        "engine": engine,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "now": now.isoformat(),
+        "results": [],
+    }
+    start_dir = os.getcwd()
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            generator.generate(directory, size, seed)
+            os.chdir(directory)
+            try:
+                report["results"].append(measure(size, engine, repeat))
+            finally:
+                db.set_storage_engine("json")
+                os.chdir(start_dir)
+    return report
+
+#Median ratio per metric against an earlier report, e.g. the last release
+def compare(report, baseline):
+    before = {result["size"]: result["metrics"] for result in baseline["results"]}
+    for result in report["results"]:
+        old = before.get(result["size"])
+        if not old:
+            continue
+        print(f"{result['size']} appointments vs {baseline.get('revision') or 'baseline'}:")
+        for name, metric in result["metrics"].items():
+            if name in old and old[name]["median_s"]:
+                print(f"  {name:28} {metric['median_s'] / old[name]['median_s']:6.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the data layer and services against generated data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Appointment counts to generate, 1k up to 1M")
+    parser.add_argument("--engine", choices=sorted(db.storage_engines), default="json")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per operation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark_results.json", help="Where the JSON report goes")
+    parser.add_argument("--compare", help="Earlier JSON report to print median ratios against")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.engine, args.repeat, args.seed)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=4)
+
+    for result in report["results"]:
+        print(f"{result['size']} appointments:")
+        for name, metric in result["metrics"].items():
+            print(f"  {name:28} {metric['median_s'] * 1000:10.2f} ms")
+    if args.compare:
+        with open(args.compare) as file:
+            compare(report, json.load(file))
+    print(f"Wrote {args.output}")
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from benchmarks import generator
+from benchmarks.run import revision
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#Each run is a fresh interpreter, so module imports and data files are read cold every time
+def launch(arguments, directory):
+    env = dict(os.environ, PYTHONPATH=repo + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    return subprocess.run([sys.executable] + arguments, cwd=directory, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+#Seconds for `python -c "import main"`: everything startup imports, without needing a display
+def import_seconds(directory):
+    result = launch(["-c", "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"], directory)
+    return float(result.stdout.strip()) if result.returncode == 0 else None
+
+#Seconds from launch to the login screen, as main.py --startup-time reports them; None without a display
+def login_screen_seconds(directory):
+    result = launch([os.path.join(repo, "main.py"), "--startup-time"], directory)
+    if result.returncode != 0 or not result.stdout.startswith("Startup:"):
+        return None
+    return float(result.stdout.split()[1])
+
+def summarize(times):
+    times = [t for t in times if t is not None]
+    if not times:
+        return None
+    return {"runs": len(times), "min_s": min(times), "median_s": statistics.median(times), "max_s": max(times)}
+
+def run(sizes, repeat=5, seed=42):
+    report = {"revision": revision(), "python": platform.python_version(), "platform": platform.platform(), "results": []}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            generator.generate(directory, size, seed)
+            report["results"].append({
+                "size": size,
+                "import": summarize([import_seconds(directory) for _ in range(repeat)]),
+                "login_screen": summarize([login_screen_seconds(directory) for _ in range(repeat)]),
+            })
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time a cold start of the app up to the login screen")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000], help="Appointment counts to generate")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="startup_results.json", help="Where the JSON report goes")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat, args.seed)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=4)
+
+    for result in report["results"]:
+        for name in ["import", "login_screen"]:
+            metric = result[name]
+            print(f"{result['size']} appointments, {name}: " +
+                  (f"{metric['median_s'] * 1000:.1f} ms" if metric else "not measured (no display?)"))
+    print(f"Wrote {args.output}")
@@ -0,0 +1,135 @@
+import argparse
+import csv
+import itertools
+import json
+import database as db
+from patient_service import PatientService
+from scheduling import SchedulingService
+
+#Columns an appointment row may carry; anything else in the file is ignored
+appointment_columns = ('patient_id', 'patient_name', 'doctor', 'date', 'time', 'reason')
+
+#Rows as dicts, read lazily so a file of any size is never held in memory at once.
+#Yields (line number, row), or (line number, None) for a line that can't be parsed.
+def read_rows(path, file_format=None):
+    file_format = file_format or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        else:
+            for line_no, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_no, None
+                    continue
+                yield line_no, row if isinstance(row, dict) else None
+
+def chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+#Usernames are the patients' emails, so an email already taken is rejected. Only the first row
+#of each email in the chunk is let through; repeats are held back until it is known whether
+#that row was created, since a row create_many rejects must not claim its email.
+def check_patient_rows(chunk, seen_emails):
+    valid, rejected, held = [], [], []
+    batch_emails = set()
+    for line_no, row in chunk:
+        if row is None:
+            rejected.append((line_no, row, "Row could not be parsed"))
+            continue
+        email = row.get('email')
+        if email and (email in seen_emails or db.find(db.users_file, 'username', email)):
+            rejected.append((line_no, row, "A user with this email already exists!"))
+            continue
+        if email and email in batch_emails:
+            held.append((line_no, row))
+            continue
+        batch_emails.add(email)
+        valid.append((line_no, row))
+    return valid, rejected, held
+
+def import_patients(path, chunk_size=5000, file_format=None, on_reject=None, on_chunk=None):
+    service = PatientService()
+    seen_emails = set()
+    imported = rejected = 0
+
+    for chunk in chunks(read_rows(path, file_format), chunk_size):
+        while chunk:
+            valid, bad, chunk = check_patient_rows(chunk, seen_emails)
+            created, failed = service.create_many(row for _, row in valid)
+            seen_emails.update(user['email'] for _, user in created)
+
+            #create_many reports failures by row, so map them back to line numbers
+            lines = {id(row): line_no for line_no, row in valid}
+            bad += [(lines[id(row)], row, error) for row, error in failed]
+            for entry in sorted(bad, key=lambda entry: entry[0]):
+                if on_reject:
+                    on_reject(*entry)
+
+            imported += len(created)
+            rejected += len(bad)
+        if on_chunk:
+            on_chunk(imported, rejected)
+    return imported, rejected
+
+def import_appointments(path, chunk_size=5000, file_format=None, on_reject=None, on_chunk=None):
+    service = SchedulingService()
+    imported = rejected = 0
+
+    for chunk in chunks(read_rows(path, file_format), chunk_size):
+        bad = [(line_no, row, "Row could not be parsed") for line_no, row in chunk if row is None]
+        valid = [(line_no, row) for line_no, row in chunk if row is not None]
+
+        requests = [{key: row[key] for key in appointment_columns if row.get(key)} for _, row in valid]
+        booked, failed = service.book_many(requests)
+
+        lines = {id(request): line_no for (line_no, _), request in zip(valid, requests)}
+        rows = {id(request): row for (_, row), request in zip(valid, requests)}
+        bad += [(lines[id(request)], rows[id(request)], error) for request, error in failed]
+        for entry in bad:
+            if on_reject:
+                on_reject(*entry)
+
+        imported += len(booked)
+        rejected += len(bad)
+        if on_chunk:
+            on_chunk(imported, rejected)
+    return imported, rejected
+
+importers = {
+    "patients": import_patients,
+    "appointments": import_appointments,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import patients or appointments from CSV or NDJSON")
+    parser.add_argument("kind", choices=sorted(importers), help="What the file contains")
+    parser.add_argument("path", help="CSV file with a header row, or NDJSON with one object per line")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows validated and committed together")
+    parser.add_argument("--rejects", help="Where rejected rows go (default: <path>.rejects.ndjson)")
+    args = parser.parse_args()
+
+    db.initialize_data_files()
+    rejects_path = args.rejects or args.path + ".rejects.ndjson"
+
+    with open(rejects_path, 'w', encoding='utf-8') as rejects:
+        def on_reject(line_no, row, error):
+            rejects.write(json.dumps({"line": line_no, "error": error, "row": row}) + "\n")
+
+        def on_chunk(imported, rejected):
+            print(f"{imported} imported, {rejected} rejected")
+
+        imported, rejected = importers[args.kind](args.path, args.chunk_size, args.format, on_reject, on_chunk)
+
+    print(f"Done: {imported} {args.kind} imported, {rejected} rejected" + (f" (see {rejects_path})" if rejected else ""))
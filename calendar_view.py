@@ -0,0 +1,166 @@
+import tkinter as tk
+from tkinter import ttk
+from datetime import date as Date, timedelta
+import database as db
+from scheduling import SchedulingService, time_slots, statuses
+from gui import GUI
+
+status_letters = {"Pending": "P", "Confirmed": "C", "Cancelled": "X", "Completed": "D"}
+booked_color = "#f4c7a1"
+
+#Day, week and month grids of one doctor's schedule, or every doctor's. Cells are drawn from the
+#per-day aggregates, so paging only looks up the days on screen; any appointment change redraws.
+class CalendarWindow:
+    modes = ["Day", "Week", "Month"]
+
+    def __init__(self, root, current_user, doctor=None):
+        self.current_user = current_user
+        self.scheduling = SchedulingService()
+        self.GUI = GUI(root)
+        self.window = tk.Toplevel(root, bg=GUI.bg_color)
+        self.window.title("Calendar")
+        self.window.geometry("1100x700+250+100")
+        self.day = Date.today()
+
+        option_frame = tk.Frame(self.window, bg=GUI.bg_color)
+        option_frame.pack(fill='x', pady=(15, 5), padx=15)
+
+        #Doctors only see their own calendar; "All" sums every doctor
+        if current_user['role'] == 'Doctor':
+            self.doctor = current_user['name']
+            self.doctor_selection = None
+        else:
+            self.doctor = doctor
+            tk.Label(option_frame, text="Doctor:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(side='left', padx=(0, 5))
+            self.doctor_selection = ttk.Combobox(option_frame, values=["All"] + self.scheduling.doctors(), width=GUI.combo_width, state='readonly')
+            self.doctor_selection.set(doctor or "All")
+            self.doctor_selection.pack(side='left', padx=5)
+            self.doctor_selection.bind("<<ComboboxSelected>>", self.select_doctor)
+
+        self.mode = ttk.Combobox(option_frame, values=self.modes, width=8, state='readonly')
+        self.mode.current(1)
+        self.mode.pack(side='left', padx=5)
+        self.mode.bind("<<ComboboxSelected>>", lambda event: self.draw())
+
+        tk.Button(option_frame, text="<", command=lambda: self.page(-1), font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=(15, 5))
+        tk.Button(option_frame, text="Today", command=self.today, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
+        tk.Button(option_frame, text=">", command=lambda: self.page(1), font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
+
+        self.period_label = tk.Label(option_frame, font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color)
+        self.period_label.pack(side='left', padx=15)
+
+        self.grid_frame = tk.Frame(self.window, bg=GUI.bg_color)
+        self.grid_frame.pack(fill='both', expand=True, padx=15, pady=(5, 15))
+
+        #A batch of changes redraws once, when Tk is next idle
+        self.redraw_pending = False
+        listener = db.subscribe(db.appointments_file, self.on_appointment_changed)
+        self.window.bind('<Destroy>', lambda event: db.unsubscribe(db.appointments_file, listener) if event.widget is self.window else None)
+
+        self.draw()
+
+    def on_appointment_changed(self, filename, op, key):
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.window.after_idle(self.draw)
+
+    def select_doctor(self, event=None):
+        doctor = self.doctor_selection.get()
+        self.doctor = doctor if doctor != "All" else None
+        self.draw()
+
+    def today(self):
+        self.day = Date.today()
+        self.draw()
+
+    def page(self, step):
+        mode = self.mode.get()
+        if mode == "Day":
+            self.day += timedelta(days=step)
+        elif mode == "Week":
+            self.day += timedelta(days=7 * step)
+        else:
+            month = self.day.month - 1 + step
+            self.day = Date(self.day.year + month // 12, month % 12 + 1, 1)
+        self.draw()
+
+    def draw(self):
+        self.redraw_pending = False
+        if not self.window.winfo_exists():
+            return
+        for widget in self.grid_frame.winfo_children():
+            widget.destroy()
+        {"Day": self.draw_day, "Week": self.draw_week, "Month": self.draw_month}[self.mode.get()]()
+
+    def cell(self, text, row, column, bg=None, width=12, anchor='center'):
+        label = tk.Label(self.grid_frame, text=text, width=width, anchor=anchor, relief='ridge', bd=1,
+                         font=self.GUI.text_font, bg=bg or "white", fg=GUI.label_color)
+        label.grid(row=row, column=column, sticky='nsew')
+        return label
+
+    def summary(self, counts):
+        return " ".join(f"{status_letters[status]}{counts[status]}" for status in statuses if counts.get(status))
+
+    #Each slot of the day; one doctor's slots show the patient and status
+    def draw_day(self):
+        day = self.day
+        self.period_label.config(text=day.strftime("%A, %B %d, %Y"))
+        info = self.scheduling.calendar(day, day, self.doctor)[day]
+        by_time = {}
+        if self.doctor:
+            for appt, user in self.scheduling.day_rows(day, self.current_user, self.doctor):
+                by_time.setdefault(appt.get('time'), []).append(f"{user.get('name', '')} ({appt.get('status')})")
+
+        self.cell("Time", 0, 0, bg=GUI.bg_color)
+        self.cell(self.summary(info['counts']) or "No appointments", 0, 1, bg=GUI.bg_color, width=60)
+        for i, time in enumerate(time_slots):
+            booked = info['slots'][i]
+            if self.doctor:
+                text = ", ".join(by_time.get(time, [])) or ("Booked" if booked else "")
+            else:
+                text = f"{booked} booked" if booked else ""
+            self.cell(time, i + 1, 0)
+            self.cell(text, i + 1, 1, bg=booked_color if booked else None, width=60, anchor='w')
+
+    #Monday to Sunday by slot; cells show whether the doctor is booked, or how many doctors are
+    def draw_week(self):
+        start = self.day - timedelta(days=self.day.weekday())
+        end = start + timedelta(days=6)
+        self.period_label.config(text=f"{start.strftime('%b %d')} - {end.strftime('%b %d, %Y')}")
+        days = self.scheduling.calendar(start, end, self.doctor)
+
+        self.cell("", 0, 0, bg=GUI.bg_color, width=8)
+        self.cell("", 1, 0, bg=GUI.bg_color, width=8)
+        for column, (day, info) in enumerate(days.items(), start=1):
+            self.cell(day.strftime("%a %d"), 0, column, bg=GUI.bg_color)
+            self.cell(self.summary(info['counts']), 1, column, bg=GUI.bg_color)
+        for i, time in enumerate(time_slots):
+            self.cell(time, i + 2, 0, width=8)
+            for column, info in enumerate(days.values(), start=1):
+                booked = info['slots'][i]
+                text = ("Booked" if self.doctor else str(booked)) if booked else ""
+                self.cell(text, i + 2, column, bg=booked_color if booked else None)
+
+    #Weeks of the month; each day shows its total and counts by status
+    def draw_month(self):
+        first = self.day.replace(day=1)
+        following = Date(first.year + first.month // 12, first.month % 12 + 1, 1)
+        last = following - timedelta(days=1)
+        start = first - timedelta(days=first.weekday())
+        end = last + timedelta(days=6 - last.weekday())
+        self.period_label.config(text=first.strftime("%B %Y"))
+        days = self.scheduling.calendar(start, end, self.doctor)
+
+        for column, name in enumerate(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]):
+            self.cell(name, 0, column, bg=GUI.bg_color, width=14)
+        for n, (day, info) in enumerate(days.items()):
+            total = sum(info['counts'].values())
+            text = f"{day.day}\n{total} appt{'s' if total != 1 else ''}\n{self.summary(info['counts'])}" if total else f"{day.day}\n\n"
+            bg = None if day.month == first.month else GUI.bg_color
+            label = self.cell(text, n // 7 + 1, n % 7, bg=booked_color if total and bg is None else bg, width=14)
+            label.bind("<Button-1>", lambda event, day=day: self.open_day(day))
+
+    def open_day(self, day):
+        self.day = day
+        self.mode.set("Day")
+        self.draw()
@@ -0,0 +1,74 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import instrumentation
+from gui import GUI
+
+#Admin-only window over the instrumentation counters: calls, latencies and bytes per operation
+class DiagnosticsWindow:
+    columns = ('count', 'total_ms', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'bytes')
+
+    def __init__(self, root, current_user):
+        if current_user['role'] != 'Admin':
+            messagebox.showerror("Error", "Only admins can open diagnostics!")
+            return
+
+        self.GUI = GUI(root)
+        self.window = tk.Toplevel(root, bg=GUI.bg_color)
+        self.window.title("Diagnostics")
+        self.window.geometry("1000x450+350+250")
+
+        tk.Label(self.window, text="Diagnostics", font=self.GUI.header1_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=(20, 5))
+
+        option_frame = tk.Frame(self.window, bg=GUI.bg_color)
+        option_frame.pack(fill='x', pady=(10, 5), padx=15)
+
+        self.enabled = tk.BooleanVar(value=instrumentation.enabled)
+        tk.Checkbutton(option_frame, text="Record timings", variable=self.enabled, command=self.toggle,
+                       font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(side='left', padx=(0, 5))
+
+        tree_frame = tk.Frame(self.window, padx=15, bg=GUI.bg_color)
+        tree_frame.pack(fill='both', expand=True)
+
+        self.stats_tree = ttk.Treeview(tree_frame, columns=self.columns)
+        self.stats_tree.pack(fill='both', expand=True)
+        self.stats_tree.heading('#0', text='Operation')
+        self.stats_tree.column('#0', width=260)
+        for col in self.columns:
+            self.stats_tree.heading(col, text=col.replace('_', ' ').capitalize())
+            self.stats_tree.column(col, width=80, anchor='e')
+
+        btn_frame = tk.Frame(self.window, bg=GUI.bg_color)
+        btn_frame.pack(pady=(5, 15))
+
+        tk.Button(btn_frame, text="Refresh", command=self.refresh, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Reset", command=self.reset, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Save as JSON", command=self.dump, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
+
+        self.refresh()
+
+    def toggle(self):
+        instrumentation.enable(self.enabled.get())
+
+    def refresh(self):
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for name, stat in instrumentation.summary().items():
+            values = [stat['count']]
+            values += [f"{stat[key] * 1000:.2f}" for key in ['total_s', 'mean_s', 'p50_s', 'p90_s', 'p99_s', 'max_s']]
+            values.append(stat['bytes'])
+            self.stats_tree.insert('', 'end', text=name, values=values)
+
+    def reset(self):
+        instrumentation.reset()
+        self.refresh()
+
+    def dump(self):
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".json",
+                                            initialfile="diagnostics.json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            instrumentation.dump(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save {path}: {e}")
+            return
+        messagebox.showinfo("Success", f"Diagnostics saved to {path}")
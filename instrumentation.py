@@ -0,0 +1,94 @@
+import collections
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+#Off unless HMS_INSTRUMENT=1 or enable() is called; when off a wrapped call costs one flag check
+enabled = os.environ.get("HMS_INSTRUMENT") == "1"
+
+#Percentiles are taken over this many of the most recent calls of each operation
+sample_size = 10000
+
+lock = threading.Lock()
+stats = {}
+
+class Stat:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.samples = collections.deque(maxlen=sample_size)
+
+    def add(self, seconds, size=None):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+        if size:
+            self.bytes += size
+
+    def summary(self):
+        samples = sorted(self.samples)
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "p50_s": percentile(samples, 50),
+            "p90_s": percentile(samples, 90),
+            "p99_s": percentile(samples, 99),
+            "max_s": self.max,
+            "bytes": self.bytes,
+        }
+
+#Nearest-rank percentile of an already sorted list
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    return samples[max(0, math.ceil(p / 100 * len(samples)) - 1)]
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+def reset():
+    with lock:
+        stats.clear()
+
+def record(name, seconds, size=None):
+    with lock:
+        stat = stats.get(name)
+        if stat is None:
+            stat = stats[name] = Stat()
+        stat.add(seconds, size)
+
+#Times every call of the wrapped function under `name`. `size`, if given, is called with the
+#same arguments after the call and returns the bytes read or written, or None if unknown.
+def timed(name, size=None):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                record(name, seconds, size(*args, **kwargs) if size else None)
+        return wrapper
+    return decorator
+
+#name -> count, total, mean, p50/p90/p99 and max seconds, and bytes
+def summary():
+    with lock:
+        return {name: stat.summary() for name, stat in sorted(stats.items())}
+
+def dump(path):
+    report = {"created_at": time.strftime("%Y-%m-%d %H:%M:%S"), "sample_size": sample_size, "stats": summary()}
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=4)
+    return report
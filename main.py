@@ -1,24 +1,68 @@
+import time
+started = time.perf_counter()
+
+import argparse
+import importlib
 import tkinter as tk
 from tkinter import messagebox, font
 from user_authentication import UserAuthentication
-from user_management import UserManagementSystem
-from appt_and_sched import AppointmentAndSchedulingSystem
-from patient_records import PatientRecordManagement
 from gui import GUI
+import database as db
+import instrumentation
+
+#Screens are imported the first time they are opened, so startup only pays for the login form
+subsystems = {
+    "user_management": ("user_management", "UserManagementSystem"),
+    "patient_records": ("patient_records", "PatientRecordManagement"),
+    "appointments": ("appt_and_sched", "AppointmentAndSchedulingSystem"),
+    "diagnostics": ("diagnostics", "DiagnosticsWindow"),
+}
+
+def subsystem(name):
+    module_name, class_name = subsystems[name]
+    return getattr(importlib.import_module(module_name), class_name)
 
 class MainApplication:
-    def __init__(self):
+    def __init__(self, on_started=None):
         self.root = tk.Tk()
         self.root.title("Hospital Management System")
         self.current_user = None
+        #Screens built this session, kept alive while hidden: name -> frame, system and data versions
+        self.screens = {}
 
         self.GUI = GUI(self.root)
 
         self.root.configure(bg=GUI.bg_color)
 
+        #Saves run on a background thread; failures come back here through root.after
+        db.writer.attach(self.root, self.on_save_error)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         self.show_login()
+
+        #Launch to login form drawn: runs once the mainloop has gone idle after the first draw
+        self.startup_seconds = None
+        self.on_started = on_started
+        self.root.after_idle(self.record_startup)
+
+    def record_startup(self):
+        self.startup_seconds = time.perf_counter() - started
+        if instrumentation.enabled:
+            instrumentation.record("main.startup", self.startup_seconds)
+        if self.on_started:
+            self.on_started(self.startup_seconds)
+
+    def on_save_error(self, filename, error):
+        messagebox.showerror("Error", f"Failed to save {filename}: {error}")
+
+    def on_close(self):
+        db.writer.detach()
+        self.root.destroy()
         
     def show_login(self):
+        #Everything the last user changed is on disk before the next login
+        db.flush_writes()
+        self.screens = {}
         for widget in self.root.winfo_children():
             widget.destroy()
             
@@ -29,9 +73,17 @@ class MainApplication:
         self.current_user = self.auth_system.current_user
         self.show_dashboard()
             
-    def show_dashboard(self):
+    #Cached screens are hidden; everything else on the window is destroyed
+    def clear_window(self):
+        frames = [screen['frame'] for screen in self.screens.values()]
         for widget in self.root.winfo_children():
-            widget.destroy()
+            if widget in frames:
+                widget.pack_forget()
+            else:
+                widget.destroy()
+
+    def show_dashboard(self):
+        self.clear_window()
             
         if self.current_user['role'] == "Admin":
             self.show_admin_dashboard()
@@ -42,8 +94,7 @@ class MainApplication:
             self.show_login()
             
     def show_admin_dashboard(self):
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        self.clear_window()
         
         self.root.geometry('500x250+575+300')
         self.root.resizable(False, False)
@@ -56,22 +107,25 @@ class MainApplication:
         
         if self.current_user['role'] in ['Admin']:
             tk.Button(btn_frame, text="User Management", 
-                    command=lambda: self.show_system(UserManagementSystem),
+                    command=lambda: self.show_system("user_management"),
                     bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(side='left', padx=10)
             
         tk.Button(btn_frame, text="Patient Records", 
-                command=lambda: self.show_system(PatientRecordManagement),
+                command=lambda: self.show_system("patient_records"),
                 bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(side='left', padx=10)
         tk.Button(btn_frame, text="Appointments", 
-                command=lambda: self.show_system(AppointmentAndSchedulingSystem),
+                command=lambda: self.show_system("appointments"),
                 bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(side='left', padx=10)
         
-        tk.Button(self.root, text="Logout", command=self.show_login,
-                bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(pady=20)
+        logout_frame = tk.Frame(self.root, bg=GUI.bg_color)
+        logout_frame.pack(pady=20)
+        tk.Button(logout_frame, text="Diagnostics", command=lambda: subsystem("diagnostics")(self.root, self.current_user),
+                bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(side='left', padx=10)
+        tk.Button(logout_frame, text="Logout", command=self.show_login,
+                bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(side='left', padx=10)
         
     def show_staff_patient_dashboard(self):
-        for widget in self.root.winfo_children():
-            widget.destroy()
+        self.clear_window()
         
         self.root.geometry('500x250+575+300')
         self.root.resizable(False, False)
@@ -85,43 +139,75 @@ class MainApplication:
         
         if role in ['Doctor', 'Nurse']:
             tk.Button(btn_frame, text="Patient Records", 
-                    command=lambda: self.show_system(PatientRecordManagement),
+                    command=lambda: self.show_system("patient_records"),
                     bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(side='left', padx=10)
         
         tk.Button(btn_frame, text="Appointments", 
-                command=lambda: self.show_system(AppointmentAndSchedulingSystem),
+                command=lambda: self.show_system("appointments"),
                 bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(side='left', padx=10)
         
         if role == 'Patient':
             tk.Button(btn_frame, text="My Records", 
-                    command=lambda: self.show_system(PatientRecordManagement),
+                    command=lambda: self.show_system("patient_records"),
                     bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(side='left', padx=10)
             
         tk.Button(self.root, text="Logout", command=self.show_login,
                 bg=GUI.button_color, fg=GUI.button_label_color, font=self.GUI.button_font).pack(pady=20)
         
-    def show_system(self, system_class):
-        for widget in self.root.winfo_children():
-            widget.destroy()
-    
-        system = system_class(self.root, self.current_user)
+    #The cache manager's version of each collection a screen shows, checked against the files first
+    def data_versions(self, system):
+        for filename in system.data_files:
+            db.get_collection(filename)
+        return {filename: db.data_version(filename) for filename in system.data_files}
+
+    #A screen is built once per login, then raised again; it reloads its lists only if its data changed
+    @instrumentation.timed("main.show_system")
+    def show_system(self, name):
+        system_class = subsystem(name)
+        self.clear_window()
+
+        screen = self.screens.get(name)
+        if screen is not None:
+            screen['frame'].pack(fill='both', expand=True)
+            self.root.title(system_class.window_title)
+            self.root.geometry(system_class.window_geometry)
+            versions = self.data_versions(screen['system'])
+            if versions != screen['versions']:
+                screen['system'].refresh()
+                screen['versions'] = versions
+            return
+
+        frame = tk.Frame(self.root, bg=GUI.bg_color)
+        frame.pack(fill='both', expand=True)
+        system = system_class(self.root, self.current_user, frame)
         
         system.logout_callback = self.show_login
         system.return_to_dashboard_callback = self.show_dashboard
         
-        if isinstance(system, UserManagementSystem):
-            system.show_patient_records_callback = lambda: self.show_system(PatientRecordManagement)
-            system.show_appointments_callback = lambda: self.show_system(AppointmentAndSchedulingSystem)
-        elif isinstance(system, PatientRecordManagement):
-            system.show_user_management_callback = lambda: self.show_system(UserManagementSystem)
-            system.show_appointments_callback = lambda: self.show_system(AppointmentAndSchedulingSystem)
-        elif isinstance(system, AppointmentAndSchedulingSystem):
-            system.show_user_management_callback = lambda: self.show_system(UserManagementSystem)
-            system.show_patient_records_callback = lambda: self.show_system(PatientRecordManagement)
+        if name == "user_management":
+            system.show_patient_records_callback = lambda: self.show_system("patient_records")
+            system.show_appointments_callback = lambda: self.show_system("appointments")
+        elif name == "patient_records":
+            system.show_user_management_callback = lambda: self.show_system("user_management")
+            system.show_appointments_callback = lambda: self.show_system("appointments")
+        elif name == "appointments":
+            system.show_user_management_callback = lambda: self.show_system("user_management")
+            system.show_patient_records_callback = lambda: self.show_system("patient_records")
+
+        self.screens[name] = {'frame': frame, 'system': system, 'versions': self.data_versions(system)}
         
     def run(self):
         self.root.mainloop()
         
 if __name__ == "__main__":
-    app = MainApplication()
+    parser = argparse.ArgumentParser(description="Hospital Management System")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="Print the seconds from launch to the login screen, then exit")
+    args = parser.parse_args()
+
+    def report_startup(seconds):
+        print(f"Startup: {seconds:.3f} s")
+        app.on_close()
+
+    app = MainApplication(report_startup if args.startup_time else None)
     app.run()
\ No newline at end of file
@@ -1,30 +1,23 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import messagebox
 import database as db
-from datetime import datetime
+import instrumentation
+from patient_service import PatientService
+from validation import ValidationError
 from gui import GUI
-
-def get_next_patient_id(patients_list):
-    if not patients_list:
-        return "P0001"
-    
-    max_id = 0
-    for patient in patients_list:
-        pid = patient.get('patient_id', 'P0000')
-        if pid and pid.startswith('P'):
-            try:
-                num = int(pid[1:])
-                if num > max_id:
-                    max_id = num
-            except ValueError:
-                continue
-    
-    return f"P{max_id + 1:04d}"
+from virtual_tree import VirtualTreeview
 
 class PatientRecordManagement:
-    def __init__(self, root, current_user):
+    window_title = "Patient Record Management System"
+    window_geometry = '1000x600+350+200'
+    #Collections the screen shows; MainApplication refreshes a cached screen when one changed
+    data_files = [db.patients_file, db.users_file]
+
+    #`parent` is the frame the screen is built in, so MainApplication can keep it alive while hidden
+    def __init__(self, root, current_user, parent=None):
         self.root = root
-        self.root.title("Patient Record Management System")
+        self.parent = parent or root
+        self.root.title(self.window_title)
         self.current_user = current_user
 
         self.GUI = GUI(self.root)
@@ -35,14 +28,12 @@ class PatientRecordManagement:
         self.show_appointments_callback = None
 
         self.root.configure(bg=GUI.bg_color)
-        self.root.geometry('1000x600+350+200')
+        self.root.geometry(self.window_geometry)
         
         db.initialize_data_files()
-        self.users = db.load_data(db.users_file)
-        self.patients = db.load_data(db.patients_file)
-        self.appointments = db.load_data(db.appointments_file)
+        self.patient_service = PatientService()
 
-        self.nav_frame = tk.Frame(root, bg=GUI.bg_color)
+        self.nav_frame = tk.Frame(self.parent, bg=GUI.bg_color)
         self.nav_frame.pack(fill='x', pady=(20, 15), padx=15)
         
         if current_user['role'] == 'Admin':
@@ -53,16 +44,14 @@ class PatientRecordManagement:
         
         tk.Button(self.nav_frame, text="Logout", command=self.logout, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='right')
         
-        self.dashboard_content = tk.Frame(root, bg=GUI.bg_color)
+        self.dashboard_content = tk.Frame(self.parent, bg=GUI.bg_color)
         self.dashboard_content.pack(fill='both', expand=True)
         
         self.show_patients()
         
-    def refresh_data(self):
-        self.users = db.load_data(db.users_file)
-        self.patients = db.load_data(db.patients_file)
-        self.appointments = db.load_data(db.appointments_file)
-        
+    def refresh(self):
+        self.load_all_patients()
+
     def show_user_management(self):
         if self.show_user_management_callback:
             self.show_user_management_callback()
@@ -85,19 +74,26 @@ class PatientRecordManagement:
 
         tk.Label(self.dashboard_content, text="Patient Record Management", font=self.GUI.header1_font, bg=GUI.bg_color, fg=GUI.label_color).pack(pady=(20, 5))
 
+        #Search over medical history, allergies, medications, notes and prescriptions
+        search_frame = tk.Frame(self.dashboard_content, bg=GUI.bg_color)
+        search_frame.pack(fill='x', pady=(10, 0), padx=15)
+
+        tk.Label(search_frame, text="Search:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).pack(side='left', padx=(0, 5))
+        self.search_entry = tk.Entry(search_frame, width=GUI.entry_width)
+        self.search_entry.pack(side='left', padx=5)
+        self.search_entry.bind('<Return>', lambda event: self.load_all_patients())
+
+        tk.Button(search_frame, text="Search", command=self.load_all_patients, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
+        tk.Button(search_frame, text="Clear", command=self.clear_search, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
+
         # Treeview for displaying patient records
         tree_frame = tk.Frame(self.dashboard_content)
         tree_frame.pack(fill="both", expand=True, pady=(10, 15), padx=15)
 
-        scrollbar = ttk.Scrollbar(tree_frame)
-        scrollbar.pack(side="right", fill="y")
-
         columns = ("name", "age", "gender", "email", "contact_no", "appointments")
-        self.record_tree = ttk.Treeview(tree_frame, columns=columns, yscrollcommand=scrollbar.set)
+        self.record_tree = VirtualTreeview(tree_frame, columns=columns)
         self.record_tree.pack(fill="both", expand=True)
 
-        scrollbar.config(command=self.record_tree.yview)
-
         # Configure Treeview columns
         self.record_tree.heading("#0", text="Patient ID")
         self.record_tree.column("#0", width=50)
@@ -117,32 +113,21 @@ class PatientRecordManagement:
             tk.Button(button_frame, text="Create New Record", command=self.create_patient_record, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='left', padx=5)
             tk.Button(button_frame, text="Edit Record", command=self.edit_patient_record, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side="left", padx=5)
 
+    @instrumentation.timed("patients.load_all_patients")
     def load_all_patients(self):
         self.record_tree.delete(*self.record_tree.get_children())
 
-        if self.current_user['role'] == 'Patient':
-            patient_id = self.current_user.get('patient_id')
-            if not patient_id:
-                return
-            
-            patient = next((p for p in self.patients if p["patient_id"] == patient_id), None)
-            user = next((u for u in self.users if u["role"] == 'Patient' and u.get('patient_id') == patient_id), None)
-            
-            if user and patient:
-                appt_ids = ", ".join(patient.get("appointments", ["No Appointments"]))
-                self.record_tree.insert("", "end", text=patient["patient_id"],
-                                        values=(user["name"], user["age"], user["gender"], user["email"], user["contact_no"], appt_ids))
-        else:
-            for patient in self.patients:
-                user = next((u for u in self.users if u.get('patient_id') == patient['patient_id'] and u['role'] == 'Patient'), None)
-                if user:
-                    appt_ids = ", ".join(patient.get("appointments", ["No Appointments"]))
-                    self.record_tree.insert("", "end", text=patient["patient_id"],
-                                            values=(user["name"], user["age"], user["gender"], user["email"], user["contact_no"], appt_ids))
+        #An empty search box lists every record the user may see
+        for patient, user in self.patient_service.search(self.search_entry.get(), self.current_user):
+            appt_ids = ", ".join(patient.get("appointments", ["No Appointments"]))
+            self.record_tree.insert("", "end", text=patient["patient_id"],
+                                    values=(user["name"], user["age"], user["gender"], user["email"], user["contact_no"], appt_ids))
                     
+    def clear_search(self):
+        self.search_entry.delete(0, tk.END)
+        self.load_all_patients()
+
     def create_patient_record(self):
-        self.refresh_data() #Ensure we have latest data
-        
         self.record_form_window = tk.Toplevel(self.root, bg=GUI.bg_color)
         self.record_form_window.title("Create New Patient Record")
         self.record_form_window.geometry("425x525+625+225")
@@ -182,87 +167,21 @@ class PatientRecordManagement:
         
     def save_new_patient(self):
         try:
-            patient_data = {}
-            user_data = {
-                'role': 'Patient',
-                'password': 'default_password'
-            }
-            
+            values = {}
             for field_name, widget in self.entry_vars.items():
                 if isinstance(widget, tk.Text):
-                    value = widget.get("1.0", tk.END).strip()
+                    values[field_name] = widget.get("1.0", tk.END).strip()
                 else:
-                    value = widget.get().strip()
-                    
-                if field_name in ['name', 'age', 'gender', 'email', 'contact_no']:
-                    user_data[field_name] = value
-                else:
-                    patient_data[field_name] = value
-                    
-            if not all(user_data.get(field) for field in ['name', 'age', 'gender', 'email']):
-                messagebox.showerror("Error", "Please fill in all required fields!")
-                return
-                
-            try:
-                user_data['age'] = int(user_data['age'])
-            except ValueError:
-                messagebox.showerror("Error", "Age must be a number!")
-                return
-            
-            print("\nDEBUG: Current patient IDs in system:")
-            for p in self.patients:
-                print(p['patient_id'])
-                
-            #Get the next patient ID
-            new_patient_id = get_next_patient_id(self.patients)
-            print(f"DEBUG: Generated new patient ID: {new_patient_id}")
-            
-            patient_record = {
-                'patient_id': new_patient_id,
-                'appointments': [],
-                'medical_history': patient_data.get('medical_history', ''),
-                'allergies': patient_data.get('allergies', ''),
-                'current_medications': patient_data.get('current_medications', ''),
-                'doctor_notes': '',
-                'prescriptions': []
-            }
-            
-            user_record = {
-                'user_id': f"U{len(self.users)+1:04d}",
-                'patient_id': new_patient_id,
-                'username': user_data['email'],
-                'password': (user_data.get('password', 'default_password')),
-                'name': user_data['name'],
-                'role': 'Patient',
-                'age': user_data['age'],
-                'gender': user_data['gender'],
-                'email': user_data['email'],
-                'contact_no': user_data.get('contact_no', ''),
-                'security_question': 'What is your favorite color?', 
-                'security_answer': 'blue' 
-            }
-            
-            print("DEBUG: New patient record to be added:")
-            print(patient_record)
-            print("DEBUG: New user record to be added:")
-            print(user_record)
-            
-            #Add to data
-            self.patients.append(patient_record)
-            self.users.append(user_record)
-            
-            #Save data
-            db.save_data(self.patients, db.patients_file)
-            db.save_data(self.users, db.users_file)
-            
-            print("DEBUG: Data saved. Reloading to verify...")
-            test_patients = db.load_data(db.patients_file)
-            print(f"DEBUG: Now {len(test_patients)} patients in system")
+                    values[field_name] = widget.get().strip()
+
+            patient_record, user_record = self.patient_service.create(values)
             
-            messagebox.showinfo("Success", f"Patient record created successfully!\nPatient ID: {new_patient_id}")
+            messagebox.showinfo("Success", f"Patient record created successfully!\nPatient ID: {patient_record['patient_id']}")
             self.record_form_window.destroy()
             self.load_all_patients()
             
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save patient record: {str(e)}")
             print(f"ERROR DETAILS: {str(e)}")
@@ -278,11 +197,10 @@ class PatientRecordManagement:
         item = self.record_tree.item(selected_item)
         patient_id = item['text']
         
-        patient = next((p for p in self.patients if p["patient_id"] == patient_id), None)
-        user = next((u for u in self.users if u.get('patient_id') == patient_id and u['role'] == 'Patient'), None)
-        
-        if not patient or not user:
-            messagebox.showerror("Error", "Patient record not found!")
+        try:
+            patient, user = self.patient_service.get(patient_id)
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
         
         self.edit_form_window = tk.Toplevel(self.root, bg=GUI.bg_color)
@@ -323,7 +241,7 @@ class PatientRecordManagement:
             doctors_notes = tk.Text(self.edit_form_window, height=4, width=GUI.textbox_width)
             doctors_notes.insert(tk.END, patient.get('doctor_notes', ''))
             doctors_notes.grid(row=len(fields)+1, column=1, padx=(5, 0), pady=5, sticky='w')
-            self.edit_entry_vars['doctors_notes'] = doctors_notes
+            self.edit_entry_vars['doctor_notes'] = doctors_notes
             
             tk.Label(self.edit_form_window, text="Prescriptions:", font=self.GUI.header2_font, bg=GUI.bg_color, fg=GUI.label_color).grid(row=len(fields)+2, column=0, padx=(15, 5), pady=5, sticky='w')
             prescriptions = tk.Text(self.edit_form_window, height=4, width=GUI.textbox_width)
@@ -339,38 +257,21 @@ class PatientRecordManagement:
             
     def save_edited_patient(self, patient_id):
         try:
-            patient = next((p for p in self.patients if p["patient_id"] == patient_id), None)
-            user = next((u for u in self.users if u.get('patient_id') == patient_id and u['role'] == 'Patient'), None)
-            
-            if not patient or not user:
-                messagebox.showerror("Error", "Patient record not found!")
-                return
-            
-            for field_name in ['name', 'age', 'gender', 'email', 'contact_no']:
-                if field_name in self.edit_entry_vars:
-                    user[field_name] = self.edit_entry_vars[field_name].get().strip()
-                    
-            for field_name in ['medical_history', 'allergies', 'current_medications', 'doctor_notes', 'prescriptions']:
-                if field_name in self.edit_entry_vars:
-                    if field_name in ['doctor_notes', 'prescriptions'] and self.current_user['role'] not in ['Admin', 'Doctor']:
-                        continue
-                    
-                    if isinstance(self.edit_entry_vars[field_name], tk.Text):
-                        patient[field_name] = self.edit_entry_vars[field_name].get("1.0", tk.END).strip()
-                    else:
-                        patient[field_name] = self.edit_entry_vars[field_name].get().strip()
-            
-            # Debug prints
-            print("Saving updated patient data:", patient)
-            print("Saving updated user data:", user)
+            values = {}
+            for field_name, widget in self.edit_entry_vars.items():
+                if isinstance(widget, tk.Text):
+                    values[field_name] = widget.get("1.0", tk.END).strip()
+                else:
+                    values[field_name] = widget.get().strip()
             
-            db.save_data(self.patients, db.patients_file)
-            db.save_data(self.users, db.users_file)
+            self.patient_service.update(patient_id, values, self.current_user['role'])
             
             messagebox.showinfo("Success", "Patient record updated successfully!")
             self.edit_form_window.destroy()
             self.load_all_patients()
             
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update patient record: {str(e)}")
             print("Error:", e)
@@ -385,8 +286,8 @@ class PatientRecordManagement:
 
         item = self.record_tree.item(selected_item)
         patient_id = item['text']  # Use patient_id
-        patient = next((p for p in self.patients if p["patient_id"] == patient_id), None)
-        user = next((u for u in self.users if u["role"] == 'Patient' and u['patient_id'] == patient_id), None)
+        patient = db.find(db.patients_file, 'patient_id', patient_id)
+        user = db.find_patient_user(patient_id)
 
         if not user and not patient:
             messagebox.showerror("Error", "Patient not found!")
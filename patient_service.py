@@ -0,0 +1,120 @@
+import database as db
+import search_index
+from validation import ValidationError
+
+#Patient details live on the Patient user; the patient record holds the medical side
+user_fields = ['name', 'age', 'gender', 'email', 'contact_no']
+patient_fields = ['medical_history', 'allergies', 'current_medications', 'doctor_notes', 'prescriptions']
+staff_only_fields = ['doctor_notes', 'prescriptions']
+
+#Creating, editing and listing patient records without any widgets
+class PatientService:
+    def get(self, patient_id):
+        patient = db.find(db.patients_file, 'patient_id', patient_id)
+        user = db.find_patient_user(patient_id)
+        if not patient or not user:
+            raise ValidationError("Patient record not found!")
+        return patient, user
+
+    #Rows are (patient record, patient user) for the records visible to current_user
+    def list_for(self, current_user):
+        if current_user['role'] == 'Patient':
+            patient_id = current_user.get('patient_id')
+            patient = db.find(db.patients_file, 'patient_id', patient_id) if patient_id else None
+            user = db.find_patient_user(patient_id) if patient_id else None
+            return [(patient, user)] if patient and user else []
+        return [(patient, user) for patient, user in db.join_patient_users(db.get_collection(db.patients_file)) if user]
+
+    #Rows like list_for(), limited to records whose clinical fields match every term of `query`
+    def search(self, query, current_user):
+        if not query.strip():
+            return self.list_for(current_user)
+        records = search_index.search(query)
+        if current_user['role'] == 'Patient':
+            records = [patient for patient in records if patient.get('patient_id') == current_user.get('patient_id')]
+        return [(patient, user) for patient, user in db.join_patient_users(records) if user]
+
+    #`values` holds the user fields and the medical fields of one form
+    def build(self, values, patient_id=None, user_id=None):
+        if not all(values.get(field) for field in ['name', 'age', 'gender', 'email']):
+            raise ValidationError("Please fill in all required fields!")
+        try:
+            age = int(values['age'])
+        except (TypeError, ValueError):
+            raise ValidationError("Age must be a number!") from None
+
+        patient_id = patient_id or db.next_id(db.patients_file)
+        patient = {
+            'patient_id': patient_id,
+            'appointments': [],
+            'medical_history': values.get('medical_history', ''),
+            'allergies': values.get('allergies', ''),
+            'current_medications': values.get('current_medications', ''),
+            'doctor_notes': '',
+            'prescriptions': []
+        }
+        user = {
+            'user_id': user_id or db.next_id(db.users_file),
+            'patient_id': patient_id,
+            'username': values['email'],
+            'password': values.get('password', 'default_password'),
+            'name': values['name'],
+            'role': 'Patient',
+            'age': age,
+            'gender': values['gender'],
+            'email': values['email'],
+            'contact_no': values.get('contact_no', ''),
+            'security_question': 'What is your favorite color?',
+            'security_answer': 'blue'
+        }
+        return patient, user
+
+    def insert(self, patient, user):
+        patients = db.get_collection(db.patients_file)
+        users = db.get_collection(db.users_file)
+        #Both records are saved in one commit
+        with db.transaction():
+            patients.append(patient)
+            users.append(user)
+            db.insert_record(patients, db.patients_file, patient)
+            db.insert_record(users, db.users_file, user)
+
+    def create(self, values):
+        patient, user = self.build(values)
+        self.insert(patient, user)
+        return patient, user
+
+    #One commit for the whole batch; returns (created (patient, user) pairs, [(values, error message)])
+    def create_many(self, rows):
+        rows = list(rows)
+        patient_ids = iter(db.next_ids(db.patients_file, len(rows))) if rows else iter(())
+        user_ids = iter(db.next_ids(db.users_file, len(rows))) if rows else iter(())
+        created, rejected = [], []
+        with db.transaction():
+            for values in rows:
+                try:
+                    patient, user = self.build(values, next(patient_ids), next(user_ids))
+                except ValidationError as e:
+                    rejected.append((values, str(e)))
+                    continue
+                self.insert(patient, user)
+                created.append((patient, user))
+        return created, rejected
+
+    #Only the fields present in `values` change; notes and prescriptions need an Admin or Doctor
+    def update(self, patient_id, values, editor_role):
+        patient, user = self.get(patient_id)
+
+        for field in user_fields:
+            if field in values:
+                user[field] = values[field]
+        for field in patient_fields:
+            if field in values:
+                if field in staff_only_fields and editor_role not in ['Admin', 'Doctor']:
+                    continue
+                patient[field] = values[field]
+
+        with db.transaction():
+            db.update_record(db.get_collection(db.patients_file), db.patients_file, patient)
+            db.update_record(db.get_collection(db.users_file), db.users_file, user)
+        return patient, user
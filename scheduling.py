@@ -0,0 +1,646 @@
+import calendar
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import date as Date, datetime, timedelta
+import database as db
+import availability
+from appointment_store import Appointment, normalize_date, parse_date, timestamp, datetime_timestamp
+from validation import ValidationError
+
+time_slots = availability.time_slots
+statuses = ["Pending", "Confirmed", "Cancelled", "Completed"]
+frequencies = ["Weekly", "Biweekly", "Monthly"]
+max_occurrences = 104
+
+def slot_key(appt):
+    return (appt.get('doctor'), normalize_date(appt.get('date')), appt.get('time'))
+
+#Count of live (non-cancelled) appointments per (doctor, date, time), kept in step with row-level writes
+class SlotOccupancy:
+    def __init__(self, data):
+        self.slots = {}
+        self.entries = {}
+        for record in data:
+            self.insert(record)
+
+    def insert(self, record):
+        if record.get('status') == 'Cancelled':
+            return
+        key = slot_key(record)
+        self.entries[id(record)] = (record, key)
+        self.slots[key] = self.slots.get(key, 0) + 1
+
+    def delete(self, record):
+        entry = self.entries.pop(id(record), None)
+        if not entry:
+            return
+        key = entry[1]
+        self.slots[key] -= 1
+        if not self.slots[key]:
+            del self.slots[key]
+
+    def update(self, record):
+        self.delete(record)
+        self.insert(record)
+
+    #`ignore` is the appointment being moved, so it doesn't conflict with itself
+    def is_taken(self, doctor, date, time, ignore=None):
+        key = (doctor, normalize_date(date), time)
+        count = self.slots.get(key, 0)
+        if ignore is not None:
+            entry = self.entries.get(id(ignore))
+            if entry and entry[1] == key:
+                count -= 1
+        return count > 0
+
+#Appointments sorted by timestamp so date filters are bisect range queries
+class TimeIndex:
+    def __init__(self, data):
+        self.records = {}
+        self.entries = {}
+        for record in data:
+            stamp = timestamp(record)
+            if stamp is not None:
+                self.entries[id(record)] = (stamp, id(record))
+                self.records[id(record)] = record
+        self.keys = sorted(self.entries.values())
+
+    def insert(self, record):
+        stamp = timestamp(record)
+        if stamp is None:
+            return
+        key = (stamp, id(record))
+        self.entries[id(record)] = key
+        self.records[id(record)] = record
+        insort(self.keys, key)
+
+    def delete(self, record):
+        key = self.entries.pop(id(record), None)
+        if key is None:
+            return
+        del self.records[id(record)]
+        idx = bisect_left(self.keys, key)
+        if idx < len(self.keys) and self.keys[idx] == key:
+            del self.keys[idx]
+
+    def update(self, record):
+        self.delete(record)
+        self.insert(record)
+
+    #Records with start <= timestamp < end, in time order; None leaves that side open
+    def between(self, start=None, end=None):
+        lo, hi = self.span(start, end)
+        return [self.records[key[1]] for key in self.keys[lo:hi]]
+
+    #Positions of the range in the sorted keys; hi - lo is its size, found without building it
+    def span(self, start=None, end=None):
+        lo = 0 if start is None else bisect_left(self.keys, (start,))
+        hi = len(self.keys) if end is None else bisect_left(self.keys, (end,))
+        return lo, hi
+
+#field -> value -> {id: record}; unlike RecordIndex's lists, a bucket drops a record in O(1),
+#so a status change doesn't scan every appointment with the old status
+class FieldIndex:
+    def __init__(self, data, fields):
+        self.fields = fields
+        self.maps = {field: {} for field in fields}
+        self.entries = {}
+        for record in data:
+            self.insert(record)
+
+    def insert(self, record):
+        values = tuple(record.get(field) for field in self.fields)
+        self.entries[id(record)] = values
+        for field, value in zip(self.fields, values):
+            self.maps[field].setdefault(value, {})[id(record)] = record
+
+    def delete(self, record):
+        values = self.entries.pop(id(record), None)
+        if values is None:
+            return
+        for field, value in zip(self.fields, values):
+            bucket = self.maps[field].get(value)
+            if bucket is not None:
+                bucket.pop(id(record), None)
+                if not bucket:
+                    del self.maps[field][value]
+
+    def update(self, record):
+        self.delete(record)
+        self.insert(record)
+
+    def get(self, field, value):
+        return self.maps[field].get(value, {})
+
+#Patient users sorted by lower-cased name, so a name prefix is a bisect range
+class PatientNameIndex:
+    def __init__(self, data):
+        self.entries = {}
+        self.keys = []
+        for record in data:
+            self.add(record)
+        self.keys.sort()
+
+    def add(self, record):
+        if record.get('role') != 'Patient' or not record.get('patient_id'):
+            return None
+        key = (str(record.get('name', '')).lower(), record['patient_id'], id(record))
+        self.entries[id(record)] = key
+        self.keys.append(key)
+        return key
+
+    def insert(self, record):
+        key = self.add(record)
+        if key is not None:
+            self.keys.pop()
+            insort(self.keys, key)
+
+    def delete(self, record):
+        key = self.entries.pop(id(record), None)
+        if key is None:
+            return
+        idx = bisect_left(self.keys, key)
+        if idx < len(self.keys) and self.keys[idx] == key:
+            del self.keys[idx]
+
+    def update(self, record):
+        self.delete(record)
+        self.insert(record)
+
+    def patient_ids(self, prefix):
+        prefix = prefix.lower()
+        idx = bisect_left(self.keys, (prefix,))
+        ids = set()
+        while idx < len(self.keys) and self.keys[idx][0].startswith(prefix):
+            ids.add(self.keys[idx][1])
+            idx += 1
+        return ids
+
+#Per (doctor, day) and per day: appointment counts by status and, for live appointments on the
+#slot grid, bookings per slot. Kept in step with row-level writes, so a calendar page is a
+#handful of dict lookups however many appointments there are.
+class DayAggregates:
+    def __init__(self, data):
+        self.doctor_days = {}
+        self.days = {}
+        self.slots = {}
+        self.entries = {}
+        for record in data:
+            self.insert(record)
+
+    def insert(self, record):
+        day = parse_date(record.get('date'))
+        if day is None:
+            return
+        status = record.get('status')
+        bit = availability.slot_bits.get(record.get('time')) if status != 'Cancelled' else None
+        entry = (record.get('doctor'), day.toordinal(), status, bit)
+        self.entries[id(record)] = entry
+        self.change(entry, 1)
+
+    def delete(self, record):
+        entry = self.entries.pop(id(record), None)
+        if entry:
+            self.change(entry, -1)
+
+    def update(self, record):
+        self.delete(record)
+        self.insert(record)
+
+    def change(self, entry, step):
+        doctor, day, status, bit = entry
+        for counts in (self.doctor_days.setdefault((doctor, day), {}), self.days.setdefault(day, {})):
+            counts[status] = counts.get(status, 0) + step
+            if not counts[status]:
+                del counts[status]
+        if not self.doctor_days[(doctor, day)]:
+            del self.doctor_days[(doctor, day)]
+        if not self.days[day]:
+            del self.days[day]
+        if bit is not None:
+            slots = self.slots.setdefault(day, [0] * len(time_slots))
+            slots[bit] += step
+            if not any(slots):
+                del self.slots[day]
+
+    #Counts by status for one doctor, or every doctor when `doctor` is None
+    def counts(self, day, doctor=None):
+        counts = self.days.get(day.toordinal()) if doctor is None else self.doctor_days.get((doctor, day.toordinal()))
+        return dict(counts or {})
+
+    #Live bookings per slot of the grid; for one doctor each is 0 or 1
+    def slot_counts(self, day, doctor=None):
+        if doctor is None:
+            return list(self.slots.get(day.toordinal(), [0] * len(time_slots)))
+        mask = availability.availability().masks.get(doctor, {}).get(day.toordinal(), 0)
+        return [mask >> i & 1 for i in range(len(time_slots))]
+
+def day_aggregates():
+    return db.get_derived(db.appointments_file, "day_aggregates", DayAggregates)
+
+def occupancy():
+    return db.get_derived(db.appointments_file, "occupancy", SlotOccupancy)
+
+def time_index():
+    return db.get_derived(db.appointments_file, "time_index", TimeIndex)
+
+#Hash indexes on the fields a query can pin down
+query_fields = ['doctor', 'status', 'patient_id']
+
+def field_index():
+    return db.get_derived(db.appointments_file, "query_index", lambda data: FieldIndex(data, query_fields))
+
+def patient_name_index():
+    return db.get_derived(db.users_file, "patient_names", PatientNameIndex)
+
+#Appointments of each recurring series; one-off appointments aren't indexed
+def series_index():
+    return db.get_derived(db.appointments_file, "series", lambda data: db.RecordIndex(data, ['series_id'], where=lambda record: record.get('series_id')))
+
+def add_months(day, months):
+    year, month = divmod(day.month - 1 + months, 12)
+    year += day.year
+    return Date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+#Dates of a recurring rule from `start`, stopping after `count` occurrences or on `until` (inclusive).
+#Monthly dates keep the start's day of the month, or the month's last day when it is shorter.
+def series_dates(start, frequency, count=None, until=None):
+    if frequency not in frequencies:
+        raise ValidationError(f"Unknown frequency: {frequency}")
+    if not count and not until:
+        raise ValidationError("Set a number of occurrences or an end date!")
+    first = parse_date(start)
+    if not first:
+        raise ValidationError("Invalid date! Use YYYY-MM-DD.")
+    last = None
+    if until:
+        last = parse_date(until)
+        if not last:
+            raise ValidationError("Invalid end date! Use YYYY-MM-DD.")
+        if last < first:
+            raise ValidationError("The end date is before the first appointment!")
+
+    dates = []
+    limit = min(count, max_occurrences + 1) if count else max_occurrences + 1
+    while len(dates) < limit:
+        n = len(dates)
+        day = add_months(first, n) if frequency == "Monthly" else first + timedelta(days=n * (14 if frequency == "Biweekly" else 7))
+        if last and day > last:
+            break
+        dates.append(day)
+    if len(dates) > max_occurrences:
+        raise ValidationError(f"A series can have at most {max_occurrences} appointments!")
+    return dates
+
+#The filter combobox presets as query criteria
+def filter_criteria(filter_by, now=None):
+    now = datetime_timestamp(now or datetime.now())
+    today = now - now % 1440
+
+    if filter_by == "Today":
+        return {'start': today, 'end': today + 1440}
+    elif filter_by == "Upcoming":
+        return {'start': now + 1}
+    elif filter_by == "Past":
+        return {'end': now + 1}
+    elif filter_by in statuses:
+        return {'statuses': [filter_by]}
+    return {}
+
+#Doctor, statuses, a start <= timestamp < end range, a patient name prefix and the role rules,
+#all in one query. Each criterion that an index can answer offers its candidate set; the
+#smallest is read and every appointment in it is checked against the remaining criteria.
+class AppointmentQuery:
+    def __init__(self, current_user=None, doctor=None, statuses=None, start=None, end=None, patient_prefix=None):
+        self.doctor = doctor
+        self.statuses = set(statuses) if statuses else None
+        self.start = start
+        self.end = end
+        self.patient_ids = None
+        self.empty = False
+
+        #Doctors only see their own appointments, patients only their own
+        role = current_user.get('role') if current_user else None
+        if role == 'Doctor':
+            if doctor is not None and doctor != current_user.get('name'):
+                self.empty = True
+            self.doctor = current_user.get('name')
+        elif role == 'Patient':
+            self.patient_ids = {current_user['patient_id']} if current_user.get('patient_id') else set()
+
+        if patient_prefix:
+            ids = patient_name_index().patient_ids(patient_prefix)
+            self.patient_ids = ids if self.patient_ids is None else self.patient_ids & ids
+
+    def matches(self, appt):
+        if self.empty:
+            return False
+        if self.doctor is not None and appt.get('doctor') != self.doctor:
+            return False
+        if self.statuses is not None and appt.get('status') not in self.statuses:
+            return False
+        if self.patient_ids is not None and appt.get('patient_id') not in self.patient_ids:
+            return False
+        if self.start is not None or self.end is not None:
+            stamp = timestamp(appt)
+            if stamp is None or (self.start is not None and stamp < self.start) or (self.end is not None and stamp >= self.end):
+                return False
+        return True
+
+    #(size, records) for each criterion with an index, plus the whole collection as a fallback
+    def candidate_sets(self):
+        index = field_index()
+        sets = []
+        if self.doctor is not None:
+            bucket = index.get('doctor', self.doctor)
+            sets.append((len(bucket), bucket.values))
+        if self.statuses is not None:
+            groups = [index.get('status', status) for status in self.statuses]
+            sets.append((sum(map(len, groups)), lambda groups=groups: [r for group in groups for r in group.values()]))
+        if self.patient_ids is not None:
+            groups = [index.get('patient_id', patient_id) for patient_id in self.patient_ids]
+            sets.append((sum(map(len, groups)), lambda groups=groups: [r for group in groups for r in group.values()]))
+        if self.start is not None or self.end is not None:
+            times = time_index()
+            lo, hi = times.span(self.start, self.end)
+            sets.append((hi - lo, lambda: [times.records[key[1]] for key in times.keys[lo:hi]]))
+        appointments = db.get_collection(db.appointments_file)
+        sets.append((len(appointments), lambda: appointments))
+        return sets
+
+    def run(self):
+        if self.empty:
+            return []
+        size, records = min(self.candidate_sets(), key=lambda entry: entry[0])
+        return [appt for appt in records() if self.matches(appt)]
+
+#Booking, rescheduling, status changes and queries without any widgets.
+#Every failure is a ValidationError carrying the message the screens show.
+class SchedulingService:
+    def doctors(self):
+        return [user['name'] for user in db.get_collection(db.users_file) if user.get('role') == 'Doctor']
+
+    def get(self, appt_id):
+        appt = db.find(db.appointments_file, 'appt_id', appt_id)
+        if not appt:
+            raise ValidationError("Appointment not found!")
+        return appt
+
+    #(appointment, patient record, patient user) for the details view
+    def details(self, appt_id):
+        appt = self.get(appt_id)
+        patient = db.find(db.patients_file, 'patient_id', appt.get('patient_id'))
+        if not patient:
+            raise ValidationError("Patient record not found!")
+        user = db.find_patient_user(patient.get('patient_id'))
+        if not user:
+            raise ValidationError("User record not found!")
+        return appt, patient, user
+
+    #Rows are (appointment, patient user); appointments without a patient user are left out.
+    #`filter_by` is a combobox preset; doctor and patient name prefix narrow it further.
+    def query(self, filter_by, current_user, now=None, doctor=None, patient_prefix=None):
+        query = AppointmentQuery(current_user, doctor=doctor, patient_prefix=patient_prefix, **filter_criteria(filter_by, now))
+        return [(appt, user) for appt, user in db.join_patient_users(query.run()) if user]
+
+    def for_doctor(self, doctor, current_user=None, filter_by="All", now=None):
+        return self.query(filter_by, current_user, now, doctor=doctor)
+
+    #The (appointment, patient user) row for one appointment if query() with the same arguments
+    #would list it; None otherwise. Lets an open list patch a single changed row.
+    def row(self, appt_id, filter_by, current_user, doctor=None, patient_prefix=None, now=None):
+        appt = db.find(db.appointments_file, 'appt_id', appt_id)
+        query = AppointmentQuery(current_user, doctor=doctor, patient_prefix=patient_prefix, **filter_criteria(filter_by, now))
+        if not appt or not query.matches(appt):
+            return None
+        user = db.find_patient_user(appt.get('patient_id'))
+        return (appt, user) if user else None
+
+    def free_times(self, doctor, date, now=None):
+        return availability.free_times(doctor, date, now)
+
+    #(date, time, doctor) slots; without a doctor, any doctor will do
+    def next_free_slots(self, doctor=None, start=None, count=10, days=90, now=None):
+        if start and not parse_date(start):
+            raise ValidationError("Invalid date! Use YYYY-MM-DD.")
+        doctors = [doctor] if doctor else self.doctors()
+        return availability.next_free(doctors, start, count, days, now)
+
+    #One entry per occurrence: {'requested': date, 'date': ..., 'time': ...}. A clashing occurrence
+    #gets the doctor's free time nearest the requested one that day, else the first free slot before
+    #the next occurrence; date and time are None when there is none.
+    def plan_series(self, doctor, start, time, frequency, count=None, until=None, now=None):
+        if not doctor or not time:
+            raise ValidationError("All fields are required!")
+        dates = series_dates(start, frequency, count, until)
+        taken = occupancy()
+        plan = []
+        for i, day in enumerate(dates):
+            requested = day.isoformat()
+            entry = {'requested': requested, 'date': requested, 'time': time}
+            if taken.is_taken(doctor, requested, time):
+                entry['date'] = entry['time'] = None
+                free = self.free_times(doctor, requested, now)
+                if free:
+                    entry['date'] = requested
+                    entry['time'] = min(free, key=lambda t: abs(time_slots.index(t) - time_slots.index(time)) if time in time_slots else 0)
+                else:
+                    gap = (dates[i + 1] - day).days - 1 if i + 1 < len(dates) else 6
+                    later = availability.next_free([doctor], (day + timedelta(days=1)).isoformat(), 1, gap, now)
+                    if later:
+                        entry['date'], entry['time'] = later[0][0], later[0][1]
+            plan.append(entry)
+        return plan
+
+    #Books every occurrence of `plan` (from plan_series, alternatives included) in one transaction.
+    #The series is identified by the ID of its first appointment.
+    def book_series(self, doctor, reason, plan, patient_name=None, patient_id=None, now=None):
+        if not plan:
+            raise ValidationError("The series has no appointments!")
+        unresolved = [entry['requested'] for entry in plan if not entry['date']]
+        if unresolved:
+            raise ValidationError(f"No free slot near {', '.join(unresolved)}!")
+        patient, user = self.find_patient(patient_name, patient_id)
+
+        ids = db.next_ids(db.appointments_file, len(plan))
+        with db.transaction():
+            return [self.book(doctor, entry['date'], entry['time'], reason, patient_id=user['patient_id'],
+                              appt_id=appt_id, now=now, series_id=ids[0])
+                    for entry, appt_id in zip(plan, ids)]
+
+    #Appointments of a series in date order
+    def series(self, series_id):
+        appointments = series_index().get_all('series_id', series_id)
+        if not appointments:
+            raise ValidationError("Series not found!")
+        return sorted(appointments, key=lambda appt: timestamp(appt) or 0)
+
+    #Occurrences that can still change: not cancelled or completed
+    def open_series(self, series_id):
+        return [appt for appt in self.series(series_id) if appt.get('status') not in ("Cancelled", "Completed")]
+
+    def cancel_series(self, series_id):
+        return self.set_status_many([appt['appt_id'] for appt in self.open_series(series_id)], "Cancelled")
+
+    #Moves every open occurrence by `days` and/or to a new time, all or nothing. Occurrences may
+    #move onto each other's old slots, since those are freed by the same change.
+    def reschedule_series(self, series_id, days=0, time=None):
+        if not days and not time:
+            raise ValidationError("Please set a time or a number of days to move by!")
+        appointments = self.open_series(series_id)
+        if not appointments:
+            raise ValidationError("No open appointments in this series!")
+        moves = []
+        for appt in appointments:
+            day = parse_date(appt.get('date'))
+            if not day:
+                raise ValidationError(f"Appointment {appt['appt_id']} has an unreadable date!")
+            moves.append((appt, (day + timedelta(days=days)).isoformat(), time or appt.get('time')))
+
+        leaving = Counter(slot_key(appt) for appt in appointments)
+        slots = occupancy().slots
+        clashes = [date for appt, date, new_time in moves
+                   if slots.get((appt.get('doctor'), date, new_time), 0) - leaving[(appt.get('doctor'), date, new_time)] > 0]
+        if clashes:
+            raise ValidationError(f"These dates are already booked: {', '.join(clashes)}")
+
+        with db.transaction():
+            for appt, date, new_time in moves:
+                appt['date'] = date
+                appt['time'] = new_time
+                db.update_record(db.get_collection(db.appointments_file), db.appointments_file, appt)
+        return appointments
+
+    #{date: {'counts': {status: n}, 'slots': [bookings per slot]}} for each day from `start` to `end`
+    #inclusive, for one doctor or all of them
+    def calendar(self, start, end, doctor=None):
+        aggregates = day_aggregates()
+        days = {}
+        for n in range((end - start).days + 1):
+            day = start + timedelta(days=n)
+            days[day] = {'counts': aggregates.counts(day, doctor), 'slots': aggregates.slot_counts(day, doctor)}
+        return days
+
+    #(appointment, patient user) rows of one day in time order, for the day view
+    def day_rows(self, day, current_user, doctor=None):
+        query = AppointmentQuery(current_user, doctor=doctor, start=day.toordinal() * 1440, end=(day.toordinal() + 1) * 1440)
+        rows = [(appt, user) for appt, user in db.join_patient_users(query.run()) if user]
+        return sorted(rows, key=lambda row: timestamp(row[0]) or 0)
+
+    def find_patient(self, patient_name=None, patient_id=None):
+        if patient_id is not None:
+            user = db.find_patient_user(patient_id)
+        else:
+            user = next((u for u in db.index(db.users_file).get_all('name', patient_name) if u['role'] == 'Patient'), None)
+        if not user:
+            raise ValidationError("Patient not found!")
+
+        patient = db.find(db.patients_file, 'patient_id', user.get('patient_id'))
+        if not patient:
+            raise ValidationError("Patient record not found!")
+        return patient, user
+
+    def check_slot(self, doctor, date, time, ignore=None):
+        if not parse_date(date):
+            raise ValidationError("Invalid date! Use YYYY-MM-DD.")
+        date = normalize_date(date)
+        if occupancy().is_taken(doctor, date, time, ignore=ignore):
+            raise ValidationError("This time slot is already booked!")
+        return date
+
+    def book(self, doctor, date, time, reason, patient_name=None, patient_id=None, appt_id=None, now=None, series_id=None):
+        if not all([patient_name or patient_id, doctor, date, time, reason]):
+            raise ValidationError("All fields are required!")
+        if not parse_date(date):
+            raise ValidationError("Invalid date! Use YYYY-MM-DD.")
+
+        patient, user = self.find_patient(patient_name, patient_id)
+        date = self.check_slot(doctor, date, time)
+
+        appt = Appointment({
+            "appt_id": appt_id or db.next_id(db.appointments_file),
+            "patient_id": user['patient_id'],
+            "doctor": doctor,
+            "date": date,
+            "time": time,
+            "reason": reason,
+            "status": "Pending",
+            "created_at": (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        })
+        if series_id:
+            appt['series_id'] = series_id
+
+        #The appointment and the patient's list of appointments are committed together
+        with db.transaction():
+            appointments = db.get_collection(db.appointments_file)
+            appointments.append(appt)
+            db.insert_record(appointments, db.appointments_file, appt)
+
+            patient.setdefault('appointments', []).append(appt['appt_id'])
+            db.update_record(db.get_collection(db.patients_file), db.patients_file, patient)
+        return appt
+
+    #Each request is the keyword arguments of book(). One commit for the whole batch;
+    #returns (booked appointments, [(request, error message)]).
+    def book_many(self, requests):
+        requests = list(requests)
+        ids = iter(db.next_ids(db.appointments_file, len(requests))) if requests else iter(())
+        booked, rejected = [], []
+        with db.transaction():
+            for request in requests:
+                try:
+                    booked.append(self.book(appt_id=next(ids), **request))
+                except ValidationError as e:
+                    rejected.append((request, str(e)))
+        return booked, rejected
+
+    def reschedule(self, appt_id, date, time, doctor=None):
+        if not date and not time:
+            raise ValidationError("Please set a time and date!")
+        if not date:
+            raise ValidationError("Please set a date!")
+        if not time:
+            raise ValidationError("Please set a time!")
+        if not parse_date(date):
+            raise ValidationError("Invalid date! Use YYYY-MM-DD.")
+
+        appt = self.get(appt_id)
+        date = self.check_slot(appt.get('doctor', doctor), date, time, ignore=appt)
+
+        appt['date'] = date
+        appt['time'] = time
+        db.update_record(db.get_collection(db.appointments_file), db.appointments_file, appt)
+        return appt
+
+    #Each change is (appt_id, date, time)
+    def reschedule_many(self, changes):
+        return self.run_batch(changes, lambda change: self.reschedule(*change))
+
+    def set_status(self, appt_id, status):
+        if not status:
+            raise ValidationError("Please select a status!")
+        if status not in statuses:
+            raise ValidationError(f"Unknown status: {status}")
+        appt = self.get(appt_id)
+        appt['status'] = status
+        db.update_record(db.get_collection(db.appointments_file), db.appointments_file, appt)
+        return appt
+
+    def set_status_many(self, appt_ids, status):
+        return self.run_batch(appt_ids, lambda appt_id: self.set_status(appt_id, status))
+
+    def cancel(self, appt_id):
+        return self.set_status(appt_id, "Cancelled")
+
+    def cancel_many(self, appt_ids):
+        return self.set_status_many(appt_ids, "Cancelled")
+
+    def run_batch(self, items, action):
+        done, rejected = [], []
+        with db.transaction():
+            for item in items:
+                try:
+                    done.append(action(item))
+                except ValidationError as e:
+                    rejected.append((item, str(e)))
+        return done, rejected
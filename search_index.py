@@ -0,0 +1,117 @@
+import re
+from bisect import bisect_left, insort
+import database as db
+
+#Clinical fields of a patient record that full-text search covers
+fields = ['medical_history', 'allergies', 'current_medications', 'doctor_notes', 'prescriptions']
+
+token_pattern = re.compile(r"[a-z0-9]+")
+
+#Older records keep prescriptions as one string, newer ones as a list (of strings or dicts)
+def field_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return " ".join(field_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(field_text(v) for v in value)
+    return str(value)
+
+def tokenize(text):
+    return token_pattern.findall(text.lower())
+
+def record_tokens(record):
+    values = [record.get(field) for field in fields]
+    text = " ".join([value if isinstance(value, str) else field_text(value) for value in values if value])
+    return frozenset(token_pattern.findall(text.lower()))
+
+#Inverted index: token -> ids of the records containing it, plus a sorted token list so a
+#prefix is a bisect to the first matching token and a walk while tokens still match.
+#Kept in step with row-level writes like the other derived structures.
+class SearchIndex:
+    def __init__(self, data):
+        self.postings = {}
+        self.entries = {}
+        self.records = {}
+        for record in data:
+            self.add(record)
+        self.terms = sorted(self.postings)
+
+    def add(self, record):
+        key = id(record)
+        tokens = record_tokens(record)
+        self.entries[key] = tokens
+        self.records[key] = record
+        postings = self.postings
+        new_terms = []
+        for token in tokens:
+            posting = postings.get(token)
+            if posting is None:
+                posting = postings[token] = {key}
+                new_terms.append(token)
+            else:
+                posting.add(key)
+        return new_terms
+
+    def insert(self, record):
+        for token in self.add(record):
+            insort(self.terms, token)
+
+    def delete(self, record):
+        tokens = self.entries.pop(id(record), None)
+        if tokens is None:
+            return
+        del self.records[id(record)]
+        for token in tokens:
+            posting = self.postings[token]
+            posting.discard(id(record))
+            if not posting:
+                del self.postings[token]
+                idx = bisect_left(self.terms, token)
+                if idx < len(self.terms) and self.terms[idx] == token:
+                    del self.terms[idx]
+
+    #Tokens are taken from the stored entry, since the record was already changed in place
+    def update(self, record):
+        self.delete(record)
+        self.insert(record)
+
+    #Posting sets of every token that starts with `prefix`
+    def prefix_postings(self, prefix):
+        idx = bisect_left(self.terms, prefix)
+        matches = []
+        while idx < len(self.terms) and self.terms[idx].startswith(prefix):
+            matches.append(self.postings[self.terms[idx]])
+            idx += 1
+        return matches
+
+    #Every term of the query must match (as a prefix). The narrowest term gives the candidates;
+    #each other term intersects them, or, when its postings outnumber the candidates, is checked
+    #against the candidates' own tokens instead of building its union.
+    def search(self, query):
+        terms = []
+        for term in set(tokenize(query)):
+            matches = self.prefix_postings(term)
+            terms.append((sum(len(posting) for posting in matches), term, matches))
+        if not terms:
+            return []
+        terms.sort(key=lambda entry: entry[0])
+
+        ids = set().union(*terms[0][2])
+        for size, term, matches in terms[1:]:
+            if not ids:
+                break
+            if size > len(ids):
+                ids = {i for i in ids if any(token.startswith(term) for token in self.entries[i])}
+            else:
+                ids &= set().union(*matches)
+        return [self.records[i] for i in ids]
+
+def search_index():
+    return db.get_derived(db.patients_file, "search", SearchIndex)
+
+#Matching patient records, in patient ID order
+def search(query):
+    return sorted(search_index().search(query), key=lambda record: str(record.get('patient_id', '')))
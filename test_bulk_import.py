@@ -0,0 +1,60 @@
+import json
+import pytest
+import database as db
+import bulk_import
+
+def test_import_links_users_and_reports_rejects(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db.set_storage_engine("json")
+    db.initialize_data_files()
+
+    (tmp_path / "patients.csv").write_text(
+        "name,age,gender,email,allergies\n"
+        "Ana Reyes,30,Female,ana@example.com,Penicillin\n"
+        "Ben Cruz,abc,Male,ben@example.com,\n"
+        "Cy Lim,41,Male,cy@example.com,\n"
+        "Ana Again,33,Female,ana@example.com,\n")
+    rejects = []
+    imported, rejected = bulk_import.import_patients("patients.csv", chunk_size=2,
+                                                     on_reject=lambda *entry: rejects.append(entry))
+
+    assert (imported, rejected) == (2, 2)
+    assert sorted((line, error) for line, _, error in rejects) == [
+        (3, "Age must be a number!"), (5, "A user with this email already exists!")]
+
+    db.cache = db.DataCache()
+    user = db.find(db.users_file, 'username', "ana@example.com")
+    assert db.find(db.patients_file, 'patient_id', user['patient_id'])['allergies'] == "Penicillin"
+
+    (tmp_path / "appointments.ndjson").write_text("\n".join(json.dumps(row) for row in [
+        {"patient_name": "Ana Reyes", "doctor": "Dr. Tan", "date": "2025-07-01", "time": "10:00", "reason": "Follow-up"},
+        {"patient_name": "Cy Lim", "doctor": "Dr. Tan", "date": "2025-07-01", "time": "10:00", "reason": "Clash"},
+    ]) + "\n{not json\n")
+    imported, rejected = bulk_import.import_appointments("appointments.ndjson")
+
+    assert (imported, rejected) == (1, 2)
+    assert db.find(db.patients_file, 'patient_id', user['patient_id'])['appointments'] == ["A0001"]
+
+#Chunk size 1 puts the repeats in later chunks; 5 puts them all in one
+@pytest.mark.parametrize("chunk_size", [1, 5])
+def test_rejected_row_does_not_claim_its_email(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.chdir(tmp_path)
+    db.set_storage_engine("json")
+    db.initialize_data_files()
+
+    (tmp_path / "patients.csv").write_text(
+        "name,age,gender,email\n"
+        "Dee Tan,old,Female,dee@example.com\n"
+        "Dee Tan,52,Female,dee@example.com\n"
+        "Dee Again,53,Female,dee@example.com\n"
+        "Eli Go,abc,Male,eli@example.com\n"
+        "Eli Go,60,Male,eli@example.com\n")
+    rejects = []
+    imported, rejected = bulk_import.import_patients("patients.csv", chunk_size=chunk_size,
+                                                     on_reject=lambda *entry: rejects.append(entry))
+
+    assert (imported, rejected) == (2, 3)
+    assert sorted((line, error) for line, _, error in rejects) == [
+        (2, "Age must be a number!"), (4, "A user with this email already exists!"), (5, "Age must be a number!")]
+    assert db.find(db.users_file, 'username', "dee@example.com")['age'] == 52
+    assert db.find(db.users_file, 'username', "eli@example.com")['age'] == 60
@@ -0,0 +1,170 @@
+import json
+import threading
+import pytest
+import database as db
+
+@pytest.fixture(params=["json", "journal", "sqlite"])
+def storage(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = db.set_storage_engine(request.param)
+    db.initialize_data_files()
+    yield engine
+    if request.param == "sqlite":
+        engine.conn.close()
+    db.set_storage_engine("json")
+
+def reload(filename):
+    db.cache = db.DataCache()
+    return db.get_collection(filename)
+
+def test_transaction_commits_every_collection_once(storage, monkeypatch):
+    commits = []
+    commit = storage.commit
+    monkeypatch.setattr(storage, "commit", lambda full, rows: (commits.append(1), commit(full, rows)))
+
+    patients = db.get_collection(db.patients_file)
+    users = db.get_collection(db.users_file)
+    with db.transaction():
+        for i in range(50):
+            patient = {"patient_id": f"P{i:04d}", "name": f"Patient {i}"}
+            user = {"user_id": f"U{i:04d}", "username": f"user{i}", "patient_id": patient["patient_id"], "role": "Patient"}
+            patients.append(patient)
+            users.append(user)
+            db.insert_record(patients, db.patients_file, patient)
+            db.insert_record(users, db.users_file, user)
+        patients[0]["name"] = "Renamed"
+        db.update_record(patients, db.patients_file, patients[0])
+
+    assert len(commits) == 1
+    assert len(reload(db.users_file)) == 50
+    saved = reload(db.patients_file)
+    assert len(saved) == 50 and saved[0]["name"] == "Renamed"
+
+def test_failed_transaction_rolls_back_memory(storage):
+    patients = db.get_collection(db.patients_file)
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            record = {"patient_id": "P0001", "name": "Never saved"}
+            patients.append(record)
+            db.insert_record(patients, db.patients_file, record)
+            raise RuntimeError("abort")
+
+    assert db.get_collection(db.patients_file) == []
+    assert reload(db.patients_file) == []
+
+def test_recover_finishes_a_logged_commit(storage):
+    if storage.name == "sqlite":
+        pytest.skip("SQLite commits atomically on its own")
+
+    #A commit that wrote its redo log but died before the renames
+    with open(db.patients_file + ".txn", "w") as f:
+        json.dump([{"patient_id": "P0001", "name": "Staged"}], f)
+    with open(db.users_file + ".txn", "w") as f:
+        json.dump([{"user_id": "U0001", "username": "staged"}], f)
+    with open(db.transaction_log, "w") as f:
+        json.dump({"renames": [[db.patients_file + ".txn", db.patients_file],
+                               [db.users_file + ".txn", db.users_file]], "rows": []}, f)
+
+    storage.recovered = False
+    db.initialize_data_files()
+
+    assert reload(db.patients_file)[0]["name"] == "Staged"
+    assert reload(db.users_file)[0]["username"] == "staged"
+
+def test_ids_continue_from_existing_records_and_never_repeat(storage):
+    patients = db.get_collection(db.patients_file)
+    for pid in ["P0001", "P0007", "legacy"]:
+        record = {"patient_id": pid}
+        patients.append(record)
+        db.insert_record(patients, db.patients_file, record)
+
+    assert db.next_id(db.patients_file) == "P0008"
+    #Deleting the newest record must not hand its number out again
+    record = patients.pop(1)
+    db.delete_record(patients, db.patients_file, record)
+    assert db.next_ids(db.patients_file, 3) == ["P0009", "P0010", "P0011"]
+
+    db.cache = db.DataCache()
+    assert db.next_id(db.patients_file) == "P0012"
+    assert db.id_number(db.format_id("A", 12345), "A") == 12345
+
+def test_login_lookup_leaves_collections_unloaded(storage):
+    users = [{"user_id": f"U{i:04d}", "username": f"user{i}", "role": "Nurse"} for i in range(20)]
+    db.save_data(users, db.users_file)
+    db.cache = db.DataCache()
+
+    assert db.find_user("user7")["user_id"] == "U0007"
+    assert db.find_user("nobody") is None
+    assert not db.cache.loaded(db.users_file)
+
+    db.get_collection(db.users_file)
+    assert db.find_user("user7") is db.find(db.users_file, 'username', "user7")
+
+def test_full_saves_during_compaction_keep_a_valid_checkpoint(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    storage = db.JournalStorage()
+    records = [{'patient_id': f"P{n:04d}", 'notes': "x" * 50} for n in range(500)]
+    storage.save_data(records, db.patients_file)
+
+    def compact_repeatedly():
+        for _ in range(20):
+            storage.append(db.patients_file, {'op': 'upsert', 'record': records[0]})
+            storage.compact(db.patients_file)
+
+    worker = threading.Thread(target=compact_repeatedly)
+    worker.start()
+    for _ in range(20):
+        storage.save_data(records, db.patients_file)
+    worker.join()
+
+    assert "Error compacting" not in capsys.readouterr().out
+    assert len(storage.load_data(db.patients_file)) == 500
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_queued_writes_snapshot_nested_values(monkeypatch):
+    monkeypatch.setattr(db.writer, "root", object())
+    patient = {'patient_id': "P0001", 'appointments': ["A0001"], 'prescriptions': [{'drug': "Amoxicillin"}]}
+    snapshot = db.snapshot_records([patient])[0]
+    patient['appointments'].append("A0002")
+    patient['prescriptions'][0]['drug'] = "Ibuprofen"
+    patient['notes'] = "edited"
+    assert snapshot == {'patient_id': "P0001", 'appointments': ["A0001"], 'prescriptions': [{'drug': "Amoxicillin"}]}
+
+@pytest.mark.parametrize("text", ['[{"id": 1}, {"id": 2}', '[{"id": 1}, {"id": 2},', '[{"id": 1}, {"id"', '['])
+def test_truncated_array_raises(tmp_path, text):
+    path = tmp_path / "cut.json"
+    path.write_text(text)
+    with pytest.raises(json.JSONDecodeError):
+        list(db.iter_json_array(str(path), chunk_size=4))
+    with pytest.raises(json.JSONDecodeError):
+        list(db.iter_json_array(str(path)))
+
+def test_closed_array_streams_across_chunks(tmp_path):
+    path = tmp_path / "whole.json"
+    path.write_text('[{"id": 1}, {"id": 2}]\n')
+    assert list(db.iter_json_array(str(path), chunk_size=4)) == [{'id': 1}, {'id': 2}]
+
+def test_rollback_with_a_queued_write_reloads_the_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db.set_storage_engine("json")
+    db.initialize_data_files()
+    db.save_data([{'patient_id': "P0001"}], db.patients_file)
+
+    monkeypatch.setattr(db.writer, "root", object())
+    release = threading.Event()
+    save = db.storage.save_data
+    monkeypatch.setattr(db.storage, "save_data", lambda data, filename: (release.wait(5), save(data, filename)))
+    patients = db.get_collection(db.patients_file)
+    db.save_data(patients, db.patients_file) #Held on the worker until released
+    threading.Timer(0.2, release.set).start()
+
+    with pytest.raises(ValueError):
+        with db.transaction():
+            patient = {'patient_id': "P0002"}
+            patients.append(patient)
+            db.insert_record(patients, db.patients_file, patient)
+            raise ValueError
+    db.writer.flush()
+
+    assert [p['patient_id'] for p in db.get_collection(db.patients_file)] == ["P0001"]
+    assert [p['patient_id'] for p in reload(db.patients_file)] == ["P0001"]
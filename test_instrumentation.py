@@ -0,0 +1,35 @@
+import json
+import database as db
+import instrumentation
+
+def test_records_counts_percentiles_and_bytes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(instrumentation, "enabled", True)
+    instrumentation.reset()
+    db.set_storage_engine("json")
+    db.initialize_data_files()
+
+    records = [{'appt_id': f"A{n:04d}", 'doctor': "Dr. Cruz"} for n in range(100)]
+    db.save_data(records, db.appointments_file)
+    for _ in range(3):
+        assert len(db.load_data(db.appointments_file)) == 100
+
+    stats = instrumentation.summary()
+    size = (tmp_path / db.appointments_file).stat().st_size
+    assert stats["database.load_data"]["count"] == 3
+    assert stats["database.load_data"]["bytes"] == 3 * size
+    assert stats["storage.save_data"]["bytes"] == size
+    assert stats["database.save_data"]["p50_s"] <= stats["database.save_data"]["max_s"]
+
+    report = instrumentation.dump(tmp_path / "diagnostics.json")
+    assert json.loads((tmp_path / "diagnostics.json").read_text())["stats"] == report["stats"]
+
+    instrumentation.enable(False)
+    db.load_data(db.appointments_file)
+    assert instrumentation.summary()["database.load_data"]["count"] == 3
+
+def test_percentile_is_nearest_rank():
+    samples = [n / 100 for n in range(1, 101)]
+    assert instrumentation.percentile(samples, 50) == 0.5
+    assert instrumentation.percentile(samples, 99) == 0.99
+    assert instrumentation.percentile([], 90) == 0.0
@@ -0,0 +1,168 @@
+import random
+import database as db
+from appointment_store import Appointment, timestamp
+from datetime import date as Date
+from scheduling import SlotOccupancy, TimeIndex, AppointmentQuery, DayAggregates
+from availability import Availability
+
+doctors = ["Cedric Palapuz", "Maria Santos", "Jose Reyes"]
+dates = [f"2025-05-{d:02d}" for d in range(1, 8)]
+times = [f"{h:02d}:{m:02d}" for h in range(9, 17) for m in [0, 30]]
+statuses = ["Pending", "Confirmed", "Cancelled", "Completed"]
+
+def brute_force_taken(appointments, doctor, date, time, ignore=None):
+    return any(a is not ignore and a['doctor'] == doctor and a['date'] == date and a['time'] == time
+               and a['status'] != 'Cancelled' for a in appointments)
+
+def random_slot(rng):
+    return rng.choice(doctors), rng.choice(dates), rng.choice(times)
+
+def test_occupancy_matches_brute_force_scan():
+    rng = random.Random(7)
+    appointments = []
+    occupancy = SlotOccupancy(appointments)
+
+    for i in range(3000):
+        doctor, date, time = random_slot(rng)
+        action = rng.random()
+
+        if action < 0.6 or not appointments:
+            taken = occupancy.is_taken(doctor, date, time)
+            assert taken == brute_force_taken(appointments, doctor, date, time)
+            if not taken:
+                appt = Appointment(appt_id=f"A{i:04d}", doctor=doctor, date=date, time=time, status="Pending")
+                appointments.append(appt)
+                occupancy.insert(appt)
+        elif action < 0.8:
+            appt = rng.choice(appointments)
+            taken = occupancy.is_taken(appt['doctor'], date, time, ignore=appt)
+            assert taken == brute_force_taken(appointments, appt['doctor'], date, time, ignore=appt)
+            if not taken:
+                appt['date'], appt['time'] = date, time
+                occupancy.update(appt)
+        elif action < 0.95:
+            appt = rng.choice(appointments)
+            appt['status'] = rng.choice(statuses)
+            occupancy.update(appt)
+        else:
+            appt = appointments.pop(rng.randrange(len(appointments)))
+            occupancy.delete(appt)
+
+    for doctor in doctors:
+        for date in dates:
+            for time in times:
+                assert occupancy.is_taken(doctor, date, time) == brute_force_taken(appointments, doctor, date, time)
+
+def test_cancelled_appointments_free_their_slot():
+    appt = Appointment(appt_id="A0001", doctor="Cedric Palapuz", date="2025-05-01", time="09:00", status="Pending")
+    occupancy = SlotOccupancy([appt])
+    assert occupancy.is_taken("Cedric Palapuz", "2025-05-01", "09:00")
+
+    appt['status'] = "Cancelled"
+    occupancy.update(appt)
+    assert not occupancy.is_taken("Cedric Palapuz", "2025-05-01", "09:00")
+
+def test_time_index_ranges_match_brute_force_and_read_legacy_dates():
+    rng = random.Random(11)
+    appointments = [Appointment(appt_id=f"A{i:04d}", doctor=rng.choice(doctors), date=rng.choice(dates),
+                                time=rng.choice(times), status="Pending") for i in range(500)]
+    appointments.append(Appointment(appt_id="A9999", doctor="Cedric Palapuz", date="May 3, 2025", time="11:30", status="Pending"))
+    index = TimeIndex(appointments)
+
+    start, end = timestamp({'date': "2025-05-03", 'time': "00:00"}), timestamp({'date': "2025-05-04", 'time': "00:00"})
+    expected = [a for a in appointments if start <= a.timestamp < end]
+    assert sorted(a['appt_id'] for a in index.between(start, end)) == sorted(a['appt_id'] for a in expected)
+    assert "A9999" in [a['appt_id'] for a in index.between(start, end)]
+
+    moved = appointments[0]
+    moved['date'] = "2025-05-03"
+    index.update(moved)
+    assert moved in index.between(start, end)
+
+def test_query_matches_brute_force_across_criteria(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db.set_storage_engine("json")
+    db.initialize_data_files()
+    rng = random.Random(5)
+    names = ["Ana Reyes", "Andres Cruz", "Ben Lim", "Bea Santos"]
+    users = [{'user_id': f"U{i:04d}", 'name': name, 'role': 'Patient', 'patient_id': f"P{i:04d}"} for i, name in enumerate(names)]
+    db.save_data(users, db.users_file)
+    appointments = db.get_collection(db.appointments_file)
+    with db.transaction():
+        for i in range(400):
+            appt = Appointment(appt_id=f"A{i:04d}", patient_id=f"P{rng.randrange(len(names)):04d}", doctor=rng.choice(doctors),
+                               date=rng.choice(dates), time=rng.choice(times), status=rng.choice(statuses))
+            appointments.append(appt)
+            db.insert_record(appointments, db.appointments_file, appt)
+
+    day = timestamp({'date': "2025-05-03", 'time': "00:00"})
+    viewers = [None, {'role': 'Admin'}, {'role': 'Doctor', 'name': doctors[0]}, {'role': 'Patient', 'patient_id': "P0001"}]
+    for _ in range(200):
+        viewer = rng.choice(viewers)
+        criteria = {'doctor': rng.choice([None] + doctors), 'statuses': rng.choice([None, ["Pending"], ["Pending", "Confirmed"]]),
+                    'start': rng.choice([None, day]), 'end': rng.choice([None, day + 1440, day + 3 * 1440]),
+                    'patient_prefix': rng.choice([None, "an", "B", "bea s"])}
+
+        def expected(a):
+            if viewer and viewer['role'] == 'Doctor' and a['doctor'] != viewer['name']:
+                return False
+            if viewer and viewer['role'] == 'Patient' and a['patient_id'] != viewer['patient_id']:
+                return False
+            name = names[int(a['patient_id'][1:])].lower()
+            stamp = timestamp(a)
+            return ((criteria['doctor'] is None or a['doctor'] == criteria['doctor'])
+                    and (criteria['statuses'] is None or a['status'] in criteria['statuses'])
+                    and (criteria['start'] is None or stamp >= criteria['start'])
+                    and (criteria['end'] is None or stamp < criteria['end'])
+                    and (criteria['patient_prefix'] is None or name.startswith(criteria['patient_prefix'].lower())))
+
+        query = AppointmentQuery(viewer, **criteria)
+        if not query.empty:
+            for size, records in query.candidate_sets():
+                assert len(records()) == size
+        result = query.run()
+        assert sorted(a['appt_id'] for a in result) == sorted(a['appt_id'] for a in appointments if expected(a))
+
+        appt = rng.choice(appointments)
+        appt['status'], appt['doctor'] = rng.choice(statuses), rng.choice(doctors)
+        db.update_record(appointments, db.appointments_file, appt)
+
+def test_next_free_slots_match_brute_force():
+    rng = random.Random(5)
+    appointments = [Appointment(appt_id=f"A{i:04d}", doctor=d, date=day, time=t, status=rng.choice(statuses))
+                    for i, (d, day, t) in enumerate(random_slot(rng) for _ in range(250))]
+    availability = Availability(appointments)
+    for appt in appointments[:50]:
+        appt['status'] = "Cancelled"
+        availability.update(appt)
+    for appt in appointments[50:80]:
+        availability.delete(appt)
+    live = appointments[:50] + appointments[80:]
+
+    expected = [(day, time, doctor) for day in dates for time in times for doctor in doctors
+                if not brute_force_taken(live, doctor, day, time)]
+    assert availability.next_free(doctors, Date(2025, 5, 1), count=len(expected) + 10, days=7) == expected
+    assert availability.next_free(doctors[1:2], Date(2025, 5, 3), count=5, days=7) == [s for s in expected if s[2] == doctors[1] and s[0] >= "2025-05-03"][:5]
+    assert availability.next_free(doctors, Date(2025, 5, 1), count=3, days=7, after=times.index("12:00")) == [s for s in expected if s[0] > "2025-05-01" or s[1] > "12:00"][:3]
+
+def test_day_aggregates_follow_bookings_moves_and_status_changes():
+    rng = random.Random(11)
+    appointments = [Appointment(appt_id=f"A{i:04d}", doctor=d, date=day, time=t, status=rng.choice(statuses))
+                    for i, (d, day, t) in enumerate(random_slot(rng) for _ in range(300))]
+    aggregates = DayAggregates(appointments)
+    for _ in range(300):
+        appt = rng.choice(appointments)
+        appt['doctor'], appt['date'], appt['time'] = random_slot(rng)
+        appt['status'] = rng.choice(statuses)
+        aggregates.update(appt)
+    for appt in appointments[:40]:
+        aggregates.delete(appt)
+    live = appointments[40:]
+
+    for day in dates:
+        when = Date.fromisoformat(day)
+        for doctor in doctors + [None]:
+            mine = [a for a in live if a['date'] == day and doctor in (None, a['doctor'])]
+            assert aggregates.counts(when, doctor) == {s: n for s in statuses if (n := sum(a['status'] == s for a in mine))}
+            if doctor is None:
+                assert aggregates.slot_counts(when) == [sum(a['time'] == t and a['status'] != 'Cancelled' for a in mine) for t in times]
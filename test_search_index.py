@@ -0,0 +1,35 @@
+import database as db
+import search_index
+
+def test_prefix_and_queries_follow_incremental_writes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db.set_storage_engine("json")
+    db.initialize_data_files()
+    patients = db.get_collection(db.patients_file)
+    patients.extend([
+        {'patient_id': "P0001", 'allergies': "Penicillin", 'prescriptions': "Amoxicillin 500mg"},
+        {'patient_id': "P0002", 'medical_history': "Asthma", 'prescriptions': ["Salbutamol", {'drug': "Penicillin V"}]},
+        {'patient_id': "P0003", 'current_medications': "Metformin", 'prescriptions': []},
+    ])
+    db.save_data(patients, db.patients_file)
+
+    ids = lambda query: [p['patient_id'] for p in search_index.search(query)]
+    assert ids("penicillin") == ["P0001", "P0002"]
+    assert ids("PENI asth") == ["P0002"]
+    assert ids("amox") == ["P0001"]
+    assert ids("penicillin metformin") == []
+
+    patient = {'patient_id': "P0004", 'allergies': "Peanuts", 'prescriptions': []}
+    patients.append(patient)
+    db.insert_record(patients, db.patients_file, patient)
+    assert ids("penicillin") == ["P0001", "P0002"]
+
+    patients[2]['doctor_notes'] = "Rash after penicillin"
+    db.update_record(patients, db.patients_file, patients[2])
+    assert ids("penicillin") == ["P0001", "P0002", "P0003"]
+    assert ids("pe") == ["P0001", "P0002", "P0003", "P0004"]
+
+    patients[0]['allergies'] = "None"
+    db.update_record(patients, db.patients_file, patients[0])
+    assert ids("penicillin") == ["P0002", "P0003"]
+    assert "metformin" in search_index.search_index().terms
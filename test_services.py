@@ -0,0 +1,118 @@
+import pytest
+from datetime import datetime
+import database as db
+from patient_service import PatientService
+from scheduling import SchedulingService, series_dates
+from user_service import UserService
+from validation import ValidationError
+
+@pytest.fixture
+def services(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db.set_storage_engine("json")
+    db.initialize_data_files()
+    return SchedulingService(), PatientService(), UserService()
+
+def add_patient(patients, name):
+    patient, user = patients.create({'name': name, 'age': '30', 'gender': 'Female', 'email': f"{name}@example.com"})
+    return patient
+
+def test_booking_rejects_taken_slot_until_cancelled(services):
+    scheduling, patients, _ = services
+    add_patient(patients, "Ana")
+
+    appt = scheduling.book(patient_name="Ana", doctor="Dr. Cruz", date="2025-05-01", time="09:00", reason="Checkup")
+    assert db.find(db.patients_file, 'patient_id', appt['patient_id'])['appointments'] == [appt['appt_id']]
+
+    with pytest.raises(ValidationError, match="already booked"):
+        scheduling.book(patient_name="Ana", doctor="Dr. Cruz", date="May 1, 2025", time="09:00", reason="Again")
+
+    scheduling.cancel(appt['appt_id'])
+    scheduling.book(patient_name="Ana", doctor="Dr. Cruz", date="2025-05-01", time="09:00", reason="Again")
+
+def test_batches_commit_once_and_report_rejects(services, monkeypatch):
+    scheduling, patients, _ = services
+    created, rejected = patients.create_many([
+        {'name': "Ben", 'age': '40', 'gender': 'Male', 'email': "ben@example.com"},
+        {'name': "Cy", 'age': 'forty', 'gender': 'Male', 'email': "cy@example.com"},
+    ])
+    assert len(created) == 1 and rejected[0][1] == "Age must be a number!"
+
+    commits = []
+    commit = db.storage.commit
+    monkeypatch.setattr(db.storage, "commit", lambda full, rows: (commits.append(1), commit(full, rows)))
+    requests = [dict(patient_name="Ben", doctor="Dr. Cruz", date="2025-05-02", time=time, reason="Visit")
+                for time in ["09:00", "09:30", "09:00"]]
+    booked, rejected = scheduling.book_many(requests)
+
+    assert len(commits) == 1
+    assert [a['time'] for a in booked] == ["09:00", "09:30"]
+    assert rejected == [(requests[2], "This time slot is already booked!")]
+
+def test_user_registration_and_login(services):
+    _, _, users = services
+    values = {'name': "Dee", 'username': "dee", 'password': "pw", 'role': "Nurse", 'age': "28", 'gender': "Female",
+              'email': "dee@example.com", 'contact_no': "0917", 'security_question': "q", 'security_answer': "Blue"}
+    with pytest.raises(ValidationError, match="don't match"):
+        users.register(values, "other")
+    user = users.register(values, "pw")
+
+    assert users.authenticate("dee", "pw") is user
+    with pytest.raises(ValidationError):
+        users.authenticate("dee", "wrong")
+
+    users.reset_password("dee", "blue", "new")
+    assert users.authenticate("dee", "new") is user
+
+def test_changes_notify_the_affected_rows(services):
+    scheduling, patients, _ = services
+    add_patient(patients, "Eve")
+    changes = []
+    listener = db.subscribe(db.appointments_file, lambda filename, op, key: changes.append((op, key)))
+    try:
+        appt = scheduling.book(patient_name="Eve", doctor="Dr. Cruz", date="2025-05-03", time="10:00", reason="Visit")
+        user = {'role': 'Admin'}
+        assert scheduling.row(appt['appt_id'], "Pending", user)[0] is appt
+
+        scheduling.cancel(appt['appt_id'])
+        assert changes == [('insert', appt['appt_id']), ('update', appt['appt_id'])]
+        assert scheduling.row(appt['appt_id'], "Pending", user) is None
+        assert scheduling.row(appt['appt_id'], "All", user, doctor="Dr. Cruz")[0] is appt
+    finally:
+        db.unsubscribe(db.appointments_file, listener)
+
+def test_series_books_alternatives_in_one_commit_and_moves_together(services, monkeypatch):
+    scheduling, patients, _ = services
+    add_patient(patients, "Dee")
+    other = scheduling.book(patient_name="Dee", doctor="Dr. Cruz", date="2025-05-15", time="10:00", reason="Other")
+    now = datetime(2025, 4, 1, 8, 0)
+
+    plan = scheduling.plan_series("Dr. Cruz", "2025-05-01", "10:00", "Weekly", count=4, now=now)
+    assert [(e['requested'], e['date'], e['time']) for e in plan] == [
+        ("2025-05-01", "2025-05-01", "10:00"), ("2025-05-08", "2025-05-08", "10:00"),
+        ("2025-05-15", "2025-05-15", "09:30"), ("2025-05-22", "2025-05-22", "10:00")]
+
+    commits = []
+    commit = db.storage.commit
+    monkeypatch.setattr(db.storage, "commit", lambda full, rows: (commits.append(1), commit(full, rows)))
+    booked = scheduling.book_series("Dr. Cruz", "Physio", plan, patient_name="Dee", now=now)
+    assert len(commits) == 1
+    series_id = booked[0]['appt_id']
+    assert [a['appt_id'] for a in scheduling.series(series_id)] == [a['appt_id'] for a in booked]
+
+    with pytest.raises(ValidationError, match="2025-05-15"):
+        scheduling.reschedule_series(series_id, time="10:00")
+    assert booked[2]['time'] == "09:30"
+
+    scheduling.cancel(other['appt_id'])
+    scheduling.reschedule_series(series_id, days=7)
+    assert [a['date'] for a in booked] == ["2025-05-08", "2025-05-15", "2025-05-22", "2025-05-29"]
+
+    scheduling.cancel_series(series_id)
+    assert {a['status'] for a in booked} == {"Cancelled"}
+
+def test_series_dates_follow_the_rule():
+    assert [d.isoformat() for d in series_dates("2025-01-31", "Monthly", count=3)] == ["2025-01-31", "2025-02-28", "2025-03-31"]
+    assert [d.isoformat() for d in series_dates("2025-01-01", "Biweekly", until="2025-02-12")] == ["2025-01-01", "2025-01-15", "2025-01-29", "2025-02-12"]
+    with pytest.raises(ValidationError):
+        series_dates("2025-01-01", "Weekly", count=500)
@@ -2,6 +2,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox, font
 import validation as valid
 import database as db
+from user_service import UserService
+from validation import ValidationError
 
 class UserAuthentication:
     def __init__(self, root):
@@ -23,8 +25,8 @@ class UserAuthentication:
         self.root.configure(bg=self.bg_color)
 
         db.initialize_data_files()
-        self.users = db.load_data(db.users_file)
-        self.patients = db.load_data(db.patients_file)
+        #Nothing is loaded for the login form; logging in reads a single user
+        self.user_service = UserService()
         
         self.dashboard_content = tk.Frame(root)
         self.dashboard_content.pack(fill='both', expand=True)
@@ -144,62 +146,33 @@ class UserAuthentication:
         tk.Button(self.register_window, text="Register", command=self.register_admin, font=self.button_font, bg=self.button_color, fg=self.button_label_color).pack(pady=10)
         
     def register_admin(self):
-        name = self.reg_name.get()
-        username = self.reg_username.get()
-        password = self.reg_password.get()
-        confirm = self.reg_confirm.get()
-        age = self.reg_age.get()
-        gender = self.reg_gender.get()
-        email = self.reg_email.get()
-        contact_no = self.reg_contact_no.get()
-        question = self.reg_question.get()
-        answer = self.reg_answer.get()
-        
-        if not all([name, username, password, confirm, age, gender, email, contact_no, question, answer]):
-            messagebox.showerror("Error", "All fields are required!")
-            return
-        
-        if password != confirm:
-            messagebox.showerror("Error", "Passwords don't match!")
-            return
-        
-        if any(user['username'] == username  and user['name'] == name for user in self.users):
-            messagebox.showerror("Error", "Username already exists!")
-            return
-        
-        new_admin = {
-            "user_id": f"U{len(self.users)+1:04d}",
-            "username": username,
-            "password": valid.hash_password(password),
-            "name": name,
-            "role": "Admin",
-            "age": age,
-            "gender": gender,
-            "email": email,
-            "contact_no": contact_no,
-            "security_question": question,
-            "security_answer": answer
+        values = {
+            'name': self.reg_name.get(),
+            'username': self.reg_username.get(),
+            'password': self.reg_password.get(),
+            'role': "Admin",
+            'age': self.reg_age.get(),
+            'gender': self.reg_gender.get(),
+            'email': self.reg_email.get(),
+            'contact_no': self.reg_contact_no.get(),
+            'security_question': self.reg_question.get(),
+            'security_answer': self.reg_answer.get()
         }
-        
-        self.users.append(new_admin)
-        db.save_data(self.users, db.users_file)
+        try:
+            self.user_service.register(values, self.reg_confirm.get())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
+            return
         
         messagebox.showinfo("Success", "Admin account created successfully!")
         self.register_window.destroy()
         self.show_login_screen()
         
     def login(self):
-        username = self.username_entry.get()
-        password = self.password_entry.get()
-        
-        if not username or not password:
-            messagebox.showerror("Error", "Please enter both username and password!")
-            return
-        
-        user = next((u for u in self.users if u['username'] == username), None)
-        
-        if not user or user['password'] != valid.hash_password(password):
-            messagebox.showerror("Error", "Invalid username or password!")
+        try:
+            user = self.user_service.authenticate(self.username_entry.get(), self.password_entry.get())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
         
         self.current_user = user
@@ -223,16 +196,10 @@ class UserAuthentication:
         tk.Button(self.forgot_window, text="Next", command=self.verify_user_for_recovery, font=self.button_font, bg=self.button_color, fg=self.button_label_color).pack(pady=10)
         
     def verify_user_for_recovery(self):
-        username = self.recovery_username.get()
-        
-        if not username:
-            messagebox.showerror("Error", "Please enter your username!")
-            return
-        
-        user = next((u for u in self.users if u['username'] == username), None)
-        
-        if not user:
-            messagebox.showerror("Error", "Username not found!")
+        try:
+            user = self.user_service.recovery_user(self.recovery_username.get())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
         
         for widget in self.forgot_window.winfo_children():
@@ -252,23 +219,12 @@ class UserAuthentication:
         tk.Button(self.forgot_window, text="Reset Password", command=lambda: self.reset_password(user), font=self.button_font, bg=self.button_color, fg=self.button_label_color).pack(pady=10)
         
     def reset_password(self, user):
-        answer = self.recovery_answer.get()
-        new_password = self.new_password.get()
-        
-        if not answer or not new_password:
-            messagebox.showerror("Error", "Please provide answer in both fields!")
+        try:
+            self.user_service.reset_password(user['username'], self.recovery_answer.get(), self.new_password.get())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
-        
-        if answer.lower() != user['security_answer'].lower():
-            messagebox.showerror("Error", "Incorrect answer to security question!")
-            return
-        
-        for u in self.users:
-            if u['username'] == user['username']:
-                u['password'] = valid.hash_password(new_password)
-                break
             
-        db.save_data(self.users, db.users_file)
         messagebox.showinfo("Success", "Password reset successfully!")
         self.forgot_window.destroy()
 
@@ -1,13 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import database as db
-import validation as valid
+import instrumentation
+from user_service import UserService
+from validation import ValidationError
 from gui import GUI
+from virtual_tree import VirtualTreeview
 
 class UserManagementSystem:
-    def __init__(self, root, current_user):
+    window_title = "User Management System"
+    window_geometry = '1000x600+350+200'
+    #Collections the screen shows; MainApplication refreshes a cached screen when one changed
+    data_files = [db.users_file]
+
+    #`parent` is the frame the screen is built in, so MainApplication can keep it alive while hidden
+    def __init__(self, root, current_user, parent=None):
         self.root = root
-        self.root.title("User Management System")
+        self.parent = parent or root
+        self.root.title(self.window_title)
         self.current_user = current_user
         
         self.GUI = GUI(self.root)
@@ -19,14 +29,13 @@ class UserManagementSystem:
         self.show_appointments_callback = None
 
         db.initialize_data_files()
-        self.users = db.load_data(db.users_file)
-        self.patients = db.load_data(db.patients_file)
+        self.user_service = UserService()
 
         self.root.configure(bg=GUI.bg_color)
-        self.root.geometry('1000x600+350+200')
+        self.root.geometry(self.window_geometry)
         
         # Now create the UI elements
-        self.nav_frame = tk.Frame(root, bg=GUI.bg_color)
+        self.nav_frame = tk.Frame(self.parent, bg=GUI.bg_color)
         self.nav_frame.pack(fill='x', pady=(20, 15))
 
         tk.Button(self.nav_frame, text="Dashboard", command=self.return_to_dashboard, 
@@ -39,11 +48,15 @@ class UserManagementSystem:
         tk.Button(self.nav_frame, text="Logout", command=self.logout, 
                 font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(side='right', padx=(5, 15))
         
-        self.dashboard_content = tk.Frame(root, bg=GUI.bg_color)
+        self.dashboard_content = tk.Frame(self.parent, bg=GUI.bg_color)
         self.dashboard_content.pack(fill='both', expand=True)
         
         self.show_user_record()
         
+    #Reloads the list, keeping the role filter
+    def refresh(self):
+        self.filter_users()
+
     def show_patient_records(self):
         if self.show_patient_records_callback:
             self.show_patient_records_callback()
@@ -90,15 +103,10 @@ class UserManagementSystem:
         tree_frame = tk.Frame(self.dashboard_content)
         tree_frame.pack(fill='both', expand=True, pady=(10, 15), padx=15)
             
-        scrollbar = ttk.Scrollbar(tree_frame)
-        scrollbar.pack(side='right', fill='y')
-            
         columns = ('username', 'name', 'role', 'age', 'gender', 'email', 'contact_no')
-        self.user_tree = ttk.Treeview(tree_frame, columns=columns, yscrollcommand=scrollbar.set)
+        self.user_tree = VirtualTreeview(tree_frame, columns=columns)
         self.user_tree.pack(fill='both', expand=True)
             
-        scrollbar.config(command=self.user_tree.yview)
-            
         #Configure columns
         self.user_tree.heading('#0', text='User ID')
         self.user_tree.column('#0', width=80)
@@ -110,15 +118,14 @@ class UserManagementSystem:
         #Add users to treeview
         self.load_all_users()
                     
+    @instrumentation.timed("users.load_all_users")
     def load_all_users(self):
+        self.show_users(self.user_service.list_users())
+
+    def show_users(self, users):
         self.user_tree.delete(*self.user_tree.get_children())
         
-        for user in self.users:
-                
-            if 'user_id' not in user:
-                print(f"Warning: User missing user_id: {user}")
-                continue
-                    
+        for user in users:
             self.user_tree.insert('', 'end', 
                                 text=user['user_id'],
                                 values=(user.get('username', ''),
@@ -129,24 +136,9 @@ class UserManagementSystem:
                                     user.get('email', ''),
                                     user.get('contact_no', '')))
 
+    @instrumentation.timed("users.filter_users")
     def filter_users(self):
-        filter_by = self.user_filter.get()
-        self.user_tree.delete(*self.user_tree.get_children())
-        
-        for user in self.users:            
-            if filter_by == "All":
-                pass
-            elif filter_by == "Admin" and user['role'] != "Admin":
-                continue
-            elif filter_by == "Doctor" and user['role'] != "Doctor":
-                continue
-            elif filter_by == "Nurse" and user['role'] != "Nurse":
-                continue
-            elif filter_by == "Patient" and user['role'] != "Patient":
-                continue
-            
-            self.user_tree.insert('', 'end', text=user['user_id'],
-                                values=(user['username'], user['name'], user['role'], user['age'], user['gender'], user['email'], user['contact_no']))
+        self.show_users(self.user_service.list_users(self.user_filter.get()))
 
     def show_register_user(self):
         self.new_user_window = tk.Toplevel(self.root, bg=GUI.bg_color)
@@ -227,64 +219,23 @@ class UserManagementSystem:
         tk.Button(self.new_user_window, text="Register", command=self.register_user, font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(pady=10)
         
     def register_user(self):
-        name = self.reg_name.get()
-        username = self.reg_username.get()
-        password = self.reg_password.get()
-        confirm = self.reg_confirm.get()
-        role = self.reg_role.get()
-        age = self.reg_age.get()
-        gender = self.reg_gender.get()
-        email = self.reg_email.get()
-        contact_no = self.reg_contact_no.get()
-        question = self.reg_question.get()
-        answer = self.reg_answer.get()
-        
-        if not all([name, username, password, confirm, role, age, gender, email, contact_no, question, answer]):
-            messagebox.showerror("Error", "All fields are required!")
+        values = {
+            'name': self.reg_name.get(),
+            'username': self.reg_username.get(),
+            'password': self.reg_password.get(),
+            'role': self.reg_role.get(),
+            'age': self.reg_age.get(),
+            'gender': self.reg_gender.get(),
+            'email': self.reg_email.get(),
+            'contact_no': self.reg_contact_no.get(),
+            'security_question': self.reg_question.get(),
+            'security_answer': self.reg_answer.get()
+        }
+        try:
+            self.user_service.register(values, self.reg_confirm.get())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
-        
-        if password != confirm:
-            messagebox.showerror("Error", "Passwords don't match!")
-            return
-        
-        if any(user['username'] == username and user['name'] == name for user in self.users):
-            messagebox.showerror("Error", "This user already has an account!")
-            return
-        
-        new_user_id = f"U{len(self.users)+1:04d}"
-
-        if role == 'Patient':
-            new_user = {
-                "user_id": new_user_id,
-                "patient_id": f"P{len(self.patients)+1:04d}",
-                "username": username,
-                "password": valid.hash_password(password),
-                "name": name,
-                "role": 'Patient',
-                "age": age,
-                "gender": gender,
-                "email": email,
-                "contact_no": contact_no,
-                "security_question": question,
-                "security_answer": answer
-            }
-        else:
-            new_user = {
-                "user_id": new_user_id,
-                "username": username,
-                "password": valid.hash_password(password),
-                "name": name,
-                "role": role,
-                "age": age,
-                "gender": gender,
-                "email": email,
-                "contact_no": contact_no,
-                "security_question": question,
-                "security_answer": answer
-            }
-
-        self.users.append(new_user)
-        db.save_data(self.users, db.users_file)
 
         messagebox.showinfo("Success", "User registered successfully!")
         self.new_user_window.destroy()
@@ -300,10 +251,10 @@ class UserManagementSystem:
         item = self.user_tree.item(selected_item)
         user_id = item['text']
         
-        user = next((u for u in self.users if u['user_id'] == user_id), None)
-        
-        if not user:
-            messagebox.showerror("Error", "User not found!")
+        try:
+            user = self.user_service.get(user_id)
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
         
         self.view_user_window = tk.Toplevel(self.root, bg=GUI.bg_color)
@@ -369,10 +320,10 @@ class UserManagementSystem:
         item = self.user_tree.item(selected_item)
         user_id = item['text']
         
-        user = next((u for u in self.users if u['user_id'] == user_id), None)
-        
-        if not user:
-            messagebox.showerror("Error", "User not found!")
+        try:
+            user = self.user_service.get(user_id)
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
         
         self.update_user_window = tk.Toplevel(self.root, bg=GUI.bg_color)
@@ -464,58 +415,24 @@ class UserManagementSystem:
         tk.Button(self.update_user_window, text="Update", command=lambda: self.update_user_details(user_id), font=self.GUI.button_font, bg=GUI.button_color, fg=GUI.button_label_color).pack(pady=10)
         
     def update_user_details(self, user_id):
-        # Get all values from the form
-        new_name = self.update_name.get()
-        new_username = self.update_username.get()
-        new_password = self.update_password.get()
-        confirm = self.update_confirm.get()
-        new_role = self.update_role.get()
-        new_age = self.update_age.get()
-        new_gender = self.update_gender.get()
-        new_email = self.update_email.get()
-        new_contact_no = self.update_contact_no.get()
-        new_question = self.update_question.get()
-        new_answer = self.update_answer.get()
-
-        # Validate password if changed
-        if new_password and new_password != confirm:
-            messagebox.showerror("Error", "Passwords don't match!")
+        values = {
+            'name': self.update_name.get(),
+            'username': self.update_username.get(),
+            'password': self.update_password.get(),
+            'role': self.update_role.get(),
+            'age': self.update_age.get(),
+            'gender': self.update_gender.get(),
+            'email': self.update_email.get(),
+            'contact_no': self.update_contact_no.get(),
+            'security_question': self.update_question.get(),
+            'security_answer': self.update_answer.get()
+        }
+        try:
+            self.user_service.update(user_id, values, self.update_confirm.get())
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        # Check for duplicate username
-        for user in self.users:
-            if user['user_id'] != user_id and user['username'] == new_username:
-                messagebox.showerror("Error", "Username already exists!")
-                return
-
-        # Find and update the user
-        for idx, user in enumerate(self.users):
-            if user['user_id'] == user_id:
-                # Only update fields that have new values
-                if new_name:
-                    self.users[idx]['name'] = new_name
-                if new_username:
-                    self.users[idx]['username'] = new_username
-                if new_password:
-                    self.users[idx]['password'] = valid.hash_password(new_password)
-                if new_role:
-                    self.users[idx]['role'] = new_role
-                if new_age:
-                    self.users[idx]['age'] = new_age
-                if new_gender != "None":
-                    self.users[idx]['gender'] = new_gender
-                if new_email:
-                    self.users[idx]['email'] = new_email
-                if new_contact_no:
-                    self.users[idx]['contact_no'] = new_contact_no
-                if new_question:
-                    self.users[idx]['security_question'] = new_question
-                if new_answer:
-                    self.users[idx]['security_answer'] = new_answer
-                
-                break
-
-        db.save_data(self.users, db.users_file)
         messagebox.showinfo("Success", "Details updated successfully!")
         self.update_user_window.destroy()
         self.show_user_record()
@@ -532,9 +449,11 @@ class UserManagementSystem:
         if not messagebox.askyesno("Confirm", "Delete this User?"):
             return
         
-        self.users = [user for user in self.users if user['user_id'] != user_id]
-            
-        db.save_data(self.users, db.users_file)
+        try:
+            self.user_service.delete(user_id)
+        except ValidationError as e:
+            messagebox.showerror("Error", str(e))
+            return
         messagebox.showinfo("Success", "User deleted!")
         self.show_user_record()
 
@@ -0,0 +1,138 @@
+import database as db
+import validation as valid
+from validation import ValidationError
+
+roles = ["Admin", "Doctor", "Nurse", "Patient"]
+security_questions = ["What's your mother's maiden name?",
+                      "What city were you born in?",
+                      "What was the name of your first pet?"]
+
+#Fields a registration form must fill in, besides the password and its confirmation
+profile_fields = ['name', 'username', 'role', 'age', 'gender', 'email', 'contact_no', 'security_question', 'security_answer']
+
+#Login, registration, account edits and password recovery without any widgets
+class UserService:
+    def authenticate(self, username, password):
+        if not username or not password:
+            raise ValidationError("Please enter both username and password!")
+        user = db.find_user(username)
+        if not user or user['password'] != valid.hash_password(password):
+            raise ValidationError("Invalid username or password!")
+        return user
+
+    def get(self, user_id):
+        user = db.find(db.users_file, 'user_id', user_id)
+        if not user:
+            raise ValidationError("User not found!")
+        return user
+
+    def list_users(self, role="All"):
+        users = db.get_collection(db.users_file)
+        return [user for user in users if 'user_id' in user and (role == "All" or user.get('role') == role)]
+
+    def build(self, values, confirm, user_id=None):
+        if not all(values.get(field) for field in profile_fields) or not values.get('password') or not confirm:
+            raise ValidationError("All fields are required!")
+        if values['password'] != confirm:
+            raise ValidationError("Passwords don't match!")
+        if any(user['name'] == values['name'] for user in db.index(db.users_file).get_all('username', values['username'])):
+            raise ValidationError("This user already has an account!")
+
+        user = {"user_id": user_id or db.next_id(db.users_file)}
+        #Patient accounts get a patient ID up front so a record can be linked to them later
+        if values['role'] == 'Patient':
+            user["patient_id"] = db.next_id(db.patients_file)
+        user.update({
+            "username": values['username'],
+            "password": valid.hash_password(values['password']),
+            "name": values['name'],
+            "role": values['role'],
+            "age": values['age'],
+            "gender": values['gender'],
+            "email": values['email'],
+            "contact_no": values['contact_no'],
+            "security_question": values['security_question'],
+            "security_answer": values['security_answer']
+        })
+        return user
+
+    def insert(self, user):
+        users = db.get_collection(db.users_file)
+        users.append(user)
+        db.insert_record(users, db.users_file, user)
+
+    def register(self, values, confirm):
+        user = self.build(values, confirm)
+        self.insert(user)
+        return user
+
+    #Each item is (values, confirm). One commit for the whole batch;
+    #returns (registered users, [(values, error message)])
+    def register_many(self, forms):
+        forms = list(forms)
+        user_ids = iter(db.next_ids(db.users_file, len(forms))) if forms else iter(())
+        registered, rejected = [], []
+        with db.transaction():
+            for values, confirm in forms:
+                try:
+                    user = self.build(values, confirm, next(user_ids))
+                except ValidationError as e:
+                    rejected.append((values, str(e)))
+                    continue
+                self.insert(user)
+                registered.append(user)
+        return registered, rejected
+
+    #Empty values leave a field as it is; a new password must match its confirmation
+    def update(self, user_id, values, confirm=None):
+        if values.get('password') and values['password'] != confirm:
+            raise ValidationError("Passwords don't match!")
+        for other in db.index(db.users_file).get_all('username', values.get('username')):
+            if other['user_id'] != user_id:
+                raise ValidationError("Username already exists!")
+
+        user = self.get(user_id)
+        for field in profile_fields + ['password']:
+            value = values.get(field)
+            if not value or (field == 'gender' and value == "None"):
+                continue
+            user[field] = valid.hash_password(value) if field == 'password' else value
+
+        db.update_record(db.get_collection(db.users_file), db.users_file, user)
+        return user
+
+    def delete(self, user_id):
+        user = self.get(user_id)
+        users = db.get_collection(db.users_file)
+        users.remove(user)
+        db.delete_record(users, db.users_file, user)
+        return user
+
+    def delete_many(self, user_ids):
+        deleted, rejected = [], []
+        with db.transaction():
+            for user_id in user_ids:
+                try:
+                    deleted.append(self.delete(user_id))
+                except ValidationError as e:
+                    rejected.append((user_id, str(e)))
+        return deleted, rejected
+
+    def recovery_user(self, username):
+        if not username:
+            raise ValidationError("Please enter your username!")
+        user = db.find(db.users_file, 'username', username)
+        if not user:
+            raise ValidationError("Username not found!")
+        return user
+
+    def reset_password(self, username, answer, new_password):
+        if not answer or not new_password:
+            raise ValidationError("Please provide answer in both fields!")
+        user = self.recovery_user(username)
+        if answer.lower() != user['security_answer'].lower():
+            raise ValidationError("Incorrect answer to security question!")
+
+        user['password'] = valid.hash_password(new_password)
+        db.update_record(db.get_collection(db.users_file), db.users_file, user)
+        return user
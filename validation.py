@@ -5,8 +5,12 @@ def hash_password(password):
     return hash.sha256(password.encode()).hexdigest()
 
 def check_admin():
-    users = db.load_data(db.users_file)
+    users = db.get_collection(db.users_file)
     for user in users:
         if user.get('role') == 'Admin':
             return True
-    return False
\ No newline at end of file
+    return False
+
+#Raised by the services; the message is meant to be shown to the user as-is
+class ValidationError(Exception):
+    pass
@@ -0,0 +1,264 @@
+from tkinter import ttk
+
+#Treeview that keeps every row in a plain list and only materializes the visible window plus a buffer.
+#It mirrors the Treeview calls the screens use (insert, delete, get_children, selection, item, heading, column).
+class VirtualTreeview(ttk.Frame):
+    buffer = 50
+    heading_height = 25
+
+    def __init__(self, master, columns=(), **kwargs):
+        super().__init__(master)
+        self.columns = tuple(columns)
+
+        self.scrollbar = ttk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.tree = ttk.Treeview(self, columns=columns, selectmode='browse', yscrollcommand=self.on_tree_scroll, **kwargs)
+        self.tree.pack(fill='both', expand=True)
+
+        self.rows = []
+        self.positions = {}
+        self.selected = None
+        self.offset = 0
+        self.window = (0, 0)
+        self.dirty = False
+        self.render_pending = False
+        self.syncing = False
+        self.sort_column = None
+        self.sort_reverse = False
+        self.next_iid = 0
+
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+        self.tree.bind('<Configure>', lambda event: self.render())
+
+    #Treeview-compatible API
+    def heading(self, column, **kwargs):
+        if 'text' in kwargs and 'command' not in kwargs:
+            kwargs['command'] = lambda: self.sort_by(column)
+        return self.tree.heading(column, **kwargs)
+
+    def column(self, column, **kwargs):
+        return self.tree.column(column, **kwargs)
+
+    def bind(self, sequence=None, func=None, add=None):
+        return self.tree.bind(sequence, func, add)
+
+    def insert(self, parent, index, iid=None, text='', values=()):
+        if iid is None or iid in self.positions:
+            iid = str(text) if text != '' and str(text) not in self.positions else f"row{self.next_iid}"
+            self.next_iid += 1
+        row = (iid, text, tuple(values))
+        if index == 'end':
+            self.positions[iid] = len(self.rows)
+            self.rows.append(row)
+            #Appending past the rendered window only moves the scrollbar
+            self.schedule_render(dirty=self.positions[iid] <= self.window[1])
+        else:
+            self.rows.insert(index, row)
+            self.reindex(index)
+            self.schedule_render()
+        return iid
+
+    #Inserts where the current sort order puts the row; at the end when the list isn't sorted
+    def insert_sorted(self, parent, iid=None, text='', values=()):
+        if self.sort_column is None:
+            return self.insert(parent, 'end', iid, text, values)
+        return self.insert(parent, self.sorted_position((iid, text, tuple(values))), iid, text, values)
+
+    #Moves an edited row back into sort order
+    def resort_row(self, iid):
+        pos = self.positions.get(iid)
+        if self.sort_column is None or pos is None:
+            return
+        row = self.rows.pop(pos)
+        new = self.sorted_position(row)
+        self.rows.insert(new, row)
+        if new != pos:
+            self.reindex(min(pos, new))
+            self.schedule_render()
+
+    def delete(self, *iids):
+        if not iids:
+            return
+        if len(iids) >= len(self.rows):
+            self.rows = []
+            self.positions = {}
+            self.selected = None
+        elif len(iids) == 1:
+            #A single row: only the rows after it change position
+            pos = self.positions.get(iids[0])
+            if pos is None:
+                return
+            del self.rows[pos]
+            del self.positions[iids[0]]
+            if self.selected == iids[0]:
+                self.selected = None
+            self.reindex(pos)
+            self.schedule_render(dirty=pos < self.window[1])
+            return
+        else:
+            removed = set(iids)
+            self.rows = [row for row in self.rows if row[0] not in removed]
+            if self.selected in removed:
+                self.selected = None
+            self.reindex()
+        self.schedule_render()
+
+    def get_children(self, item=None):
+        return tuple(row[0] for row in self.rows)
+
+    def exists(self, iid):
+        return iid in self.positions
+
+    def selection(self):
+        return (self.selected,) if self.selected in self.positions else ()
+
+    def selection_set(self, iid):
+        self.selected = iid
+        self.see(iid)
+
+    def item(self, iid, **kwargs):
+        if isinstance(iid, (tuple, list)):
+            iid = iid[0]
+        pos = self.positions[iid]
+        if kwargs:
+            _, text, values = self.rows[pos]
+            self.rows[pos] = (iid, kwargs.get('text', text), tuple(kwargs.get('values', values)))
+            #A rendered row is edited in place; any other row is picked up when it scrolls into view
+            if self.window[0] <= pos < self.window[1] and self.tree.exists(iid) and not self.dirty:
+                self.tree.item(iid, text=self.rows[pos][1], values=self.rows[pos][2])
+            return None
+        _, text, values = self.rows[pos]
+        return {'text': text, 'values': list(values)}
+
+    def see(self, iid):
+        pos = self.positions.get(iid)
+        if pos is None:
+            return
+        page = self.page_size()
+        if pos < self.offset or pos >= self.offset + page:
+            self.offset = max(0, pos - page // 2)
+        self.render()
+
+    def __len__(self):
+        return len(self.rows)
+
+    #Sorting works on the full row list, not just what is on screen
+    def sort_by(self, column):
+        self.sort_reverse = not self.sort_reverse if self.sort_column == column else False
+        self.sort_column = column
+        self.resort()
+
+    def sort_key(self, row):
+        idx = None if self.sort_column == '#0' else self.columns.index(self.sort_column)
+        value = row[1] if idx is None else (row[2][idx] if idx < len(row[2]) else '')
+        try:
+            return (0, float(value), '')
+        except (TypeError, ValueError):
+            return (1, 0, str(value).lower())
+
+    #Binary search for where `row` goes, after any rows with an equal key
+    def sorted_position(self, row):
+        key = self.sort_key(row)
+        lo, hi = 0, len(self.rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = self.sort_key(self.rows[mid])
+            if (other < key if self.sort_reverse else other > key):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    #Reapplies the current sort, e.g. after the rows were replaced
+    def resort(self):
+        if self.sort_column is None:
+            return
+        self.rows.sort(key=self.sort_key, reverse=self.sort_reverse)
+        self.reindex()
+        self.dirty = True
+        if self.selected in self.positions:
+            self.see(self.selected)
+        else:
+            self.render()
+
+    #Windowing
+    def reindex(self, start=0):
+        if start:
+            for pos in range(start, len(self.rows)):
+                self.positions[self.rows[pos][0]] = pos
+        else:
+            self.positions = {row[0]: pos for pos, row in enumerate(self.rows)}
+
+    def schedule_render(self, dirty=True):
+        self.dirty = self.dirty or dirty
+        if not self.render_pending:
+            self.render_pending = True
+            self.after_idle(self.render)
+
+    def page_size(self):
+        row_height = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        try:
+            row_height = int(row_height)
+        except (TypeError, ValueError):
+            row_height = 20
+        return max(1, (self.tree.winfo_height() - self.heading_height) // row_height)
+
+    def render(self):
+        self.render_pending = False
+        if not self.winfo_exists():
+            return
+        total = len(self.rows)
+        page = self.page_size()
+        self.offset = max(0, min(self.offset, total - page))
+        start, end = self.window
+        margin = self.buffer // 2
+
+        needs_rows = (self.dirty or self.offset < start or self.offset + page > end
+                      or (start > 0 and self.offset - start < margin)
+                      or (end < total and end - (self.offset + page) < margin))
+
+        if needs_rows:
+            start = max(0, self.offset - self.buffer)
+            end = min(total, self.offset + page + self.buffer)
+            self.tree.delete(*self.tree.get_children())
+            for iid, text, values in self.rows[start:end]:
+                self.tree.insert('', 'end', iid=iid, text=text, values=values)
+            self.window = (start, end)
+            self.dirty = False
+            if self.selected in self.positions and start <= self.positions[self.selected] < end:
+                self.tree.selection_set(self.selected)
+
+        self.syncing = True
+        self.tree.yview_moveto((self.offset - start + 0.01) / max(1, end - start))
+        self.syncing = False
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + page) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    #The scrollbar drives the offset across all rows
+    def yview(self, *args):
+        total = len(self.rows)
+        page = self.page_size()
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (page if args[2] == 'pages' else 1)
+            self.offset += step
+        self.render()
+
+    #Mouse wheel and keyboard scrolling inside the tree move within the buffer
+    def on_tree_scroll(self, first, last):
+        if self.syncing:
+            return
+        start, end = self.window
+        offset = start + round(float(first) * (end - start))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def on_select(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            self.selected = selection[0]